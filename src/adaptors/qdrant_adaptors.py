@@ -1,18 +1,45 @@
+import copy
+import json
 import logging
 import os
+import threading
+import time
 import uuid
 from datetime import datetime
+from typing import TYPE_CHECKING
 
+import numpy as np
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
-from qdrant_client.models import Distance, PointStruct, VectorParams
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    VectorParams,
+)
 
+from adaptors.qdrant_pool import QdrantPool
+from services.pdf_extraction_cache import PdfExtractionCache
 from services.text_cleaner import TextCleaner
+from services.thai_chunker import ThaiTokenChunker
 from services.thai_to_vec_embedder import Thai2VecEmbedder
+from utilities.file_utils import file_sha256
+from utilities.throttle import Throttle
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 
 class QdrantAdaptor:
@@ -25,50 +52,152 @@ class QdrantAdaptor:
     Attributes:
         collection_name (str): The name of the Qdrant collection.
         thai2vec (Thai2VecEmbedder): Embedding generator for text data.
-        client (QdrantClient): Qdrant client for database interaction.
+        pool (QdrantPool): Pooled Qdrant access with timeouts, retries and hedged reads.
+        client (QdrantClient): The pool's primary Qdrant client.
         text_cleaner (TextCleaner): Service for preprocessing text data.
+        extraction_cache (PdfExtractionCache | None): Cache of extracted PDF pages.
+        chunker (ThaiTokenChunker): Splits PDF pages into token-sized chunks.
         vector_size (int): The size of the vector embeddings.
+        quantization (str | None): Quantization used for new collections ("int8", "binary" or None).
+        throttle (Throttle | None): Caps the upload rate in points per second, if set.
+        rebuild_status (dict): Progress of the latest blue/green rebuild.
     """
 
-    def __init__(self, collection_name: str):
+    QUANTIZATION_TYPES = ("int8", "binary")
+    # Scans of the live collection for changes made during a rebuild.
+    CATCH_UP_PASSES = 3
+    PAYLOAD_INDEXES = {
+        "metadata.source": PayloadSchemaType.KEYWORD,
+        "metadata.document_id": PayloadSchemaType.KEYWORD,
+        "metadata.effective_date": PayloadSchemaType.KEYWORD,
+        "metadata.is_current": PayloadSchemaType.BOOL,
+        "metadata.file_hash": PayloadSchemaType.KEYWORD,
+    }
+
+    def __init__(
+        self,
+        collection_name: str,
+        quantization: str | None = None,
+        thai2vec: Thai2VecEmbedder | None = None,
+        pool: QdrantPool | None = None,
+    ):
         """
         Initialize the QdrantAdaptor.
 
         Args:
             collection_name (str): The name of the Qdrant collection to use.
+            quantization (str | None, optional): Quantization for a newly created collection,
+                                                 "int8" (scalar) or "binary". Defaults to None (plain float32).
+            thai2vec (Thai2VecEmbedder | None, optional): An embedder to share with other services.
+                                                          A new one is created when omitted.
+            pool (QdrantPool | None, optional): A client pool to share with other services.
+                                                One is created from QDRANT_URL when omitted.
         """
         load_dotenv(override=True)
         logging.basicConfig(level=logging.INFO)
 
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
+        if pool is None:
+            openai_api_key = os.getenv("OPENAI_API_KEY")
+            qdrant_url = os.getenv("QDRANT_URL")
+            qdrant_api_key = os.getenv("QDRANT_API_KEY")
 
-        if not openai_api_key or not qdrant_url or not qdrant_api_key:
-            raise ValueError(
-                "Missing required API keys or URLs in environment variables."
+            if not openai_api_key or not qdrant_url or not qdrant_api_key:
+                raise ValueError(
+                    "Missing required API keys or URLs in environment variables."
+                )
+
+            pool = QdrantPool(
+                url=qdrant_url,
+                api_key=qdrant_api_key,
+                size=int(os.getenv("QDRANT_POOL_SIZE", "2")),
+                prefer_grpc_writes=os.getenv("QDRANT_GRPC_UPLOADS", "").lower()
+                in ("1", "true", "yes"),
             )
 
-        self.thai2vec = Thai2VecEmbedder()
-        self.client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
+        self.thai2vec = thai2vec or Thai2VecEmbedder()
+        self.pool = pool
+        self.client = pool.client
         self.text_cleaner = TextCleaner()
+        self.extraction_cache = PdfExtractionCache.from_env()
+        self.chunker = ThaiTokenChunker.from_env()
         self.collection_name = collection_name
         self.vector_size = 300
+        self.quantization = quantization
+        self.throttle = None
+        self.rebuild_status = {"state": "idle"}
+        # One lock per document_id, see `refresh_current_version`
+        self._refresh_locks = {}
+        self._refresh_locks_lock = threading.Lock()
 
         self.create_collection_if_not_exists(self.vector_size)
 
-    def create_collection(self, vector_size: int):
+    def create_collection(self, vector_size: int, quantization: str | None = None):
         """
         Creates a new collection in Qdrant.
 
+        When quantization is enabled the original float32 vectors are kept on disk for
+        rescoring while the quantized copy stays in RAM for the first search pass.
+
         Args:
             vector_size (int): The size of the vector embeddings.
+            quantization (str | None, optional): "int8", "binary" or None. Defaults to
+                                                 the adaptor's configured quantization.
         """
-        self.client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+        quantization = quantization or self.quantization
+        if quantization and quantization not in self.QUANTIZATION_TYPES:
+            raise ValueError(
+                f"Unsupported quantization '{quantization}'. "
+                f"Use one of {self.QUANTIZATION_TYPES} or None."
+            )
+
+        if quantization == "int8":
+            quantization_config = ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        elif quantization == "binary":
+            quantization_config = BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=True)
+            )
+        else:
+            quantization_config = None
+
+        self.pool.write(
+            "create_collection",
+            lambda c: c.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(
+                    size=vector_size,
+                    distance=Distance.COSINE,
+                    on_disk=quantization_config is not None,
+                ),
+                quantization_config=quantization_config,
+            ),
         )
-        logging.info(f"Collection '{self.collection_name}' created successfully.")
+        self.create_payload_indexes()
+        logging.info(
+            f"Collection '{self.collection_name}' created successfully "
+            f"(quantization: {quantization or 'none'})."
+        )
+
+    def create_payload_indexes(self):
+        """
+        Creates the payload indexes used for version filtering and file lookups.
+
+        Creating an index that already exists is a no-op in Qdrant, so this is
+        safe to call on existing collections.
+        """
+        for field_name, field_schema in self.PAYLOAD_INDEXES.items():
+            self.pool.write(
+                "create_payload_index",
+                lambda c: c.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                    wait=True,
+                ),
+            )
 
     def create_collection_if_not_exists(self, vector_size: int) -> bool:
         """
@@ -80,9 +209,12 @@ class QdrantAdaptor:
         Returns:
             bool: True if the collection exists, False if it was newly created.
         """
-        is_exists_collection = self.client.collection_exists(self.collection_name)
+        is_exists_collection = self.pool.read(
+            "collection_exists", lambda c: c.collection_exists(self.collection_name)
+        ) or self.resolve_alias() is not None
         if is_exists_collection:
             logging.info(f"Collection '{self.collection_name}' already exists.")
+            self.create_payload_indexes()
         else:
             self.create_collection(vector_size)
 
@@ -91,44 +223,49 @@ class QdrantAdaptor:
         )
         return is_exists_collection
 
-    def add_documents_from_pdf(self, pdf_path: str, effective_date: str = None):
+    def add_documents_from_pdf(
+        self, pdf_path: str, effective_date: str = None, document_id: str = None
+    ):
         """
         Adds documents from a PDF file to the vector store.
 
+        The chunks are stored with `is_current` set to False; call
+        `refresh_current_version` to make them visible to retrieval.
+
         Args:
             pdf_path (str): The file path of the PDF to process.
             effective_date (str, optional): The effective date to associate with the data.
                                              If not provided, the current datetime is used.
+            document_id (str, optional): Identifies all versions of the same document.
+                                         Defaults to the file name.
+
+        Returns:
+            int: The number of chunk embeddings added.
         """
         if not effective_date:
             effective_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
 
-        loader = PyPDFLoader(pdf_path)
-        documents = loader.load()
-
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200
+        process_chunks = load_pdf_chunks(
+            pdf_path,
+            effective_date,
+            self.text_cleaner,
+            file_sha256(pdf_path),
+            self.extraction_cache,
+            document_id,
+            self.chunker,
         )
-        chunks = text_splitter.split_documents(documents)
-
-        process_chunks = []
-        for c in chunks:
-            c.page_content = self.text_cleaner.preprocess_text(c.page_content)
-            metadata_with_date = c.metadata.copy()
-            metadata_with_date["effective_date"] = effective_date
-            process_chunks.append(
-                Document(page_content=c.page_content, metadata=metadata_with_date)
-            )
-
-        points = self.process_documents(process_chunks)
+        ids, vectors, payloads = self.process_documents(process_chunks)
 
-        if points:
-            self.client.upsert(collection_name=self.collection_name, points=points)
-            print(f"Successfully added {len(points)} chunk embeddings into Qdrant.")
+        if ids:
+            self.upload_points(ids, vectors, payloads)
+            print(f"Successfully added {len(ids)} chunk embeddings into Qdrant.")
         else:
             print("No valid chunk embeddings found.")
+        return len(ids)
 
-    def process_documents(self, process_chunks: list[Document]) -> list[PointStruct]:
+    def process_documents(
+        self, process_chunks: list["Document"]
+    ) -> tuple[list[str], np.ndarray, list[dict]]:
         """
         Processes the documents and generates embeddings for each chunk.
 
@@ -136,32 +273,67 @@ class QdrantAdaptor:
             process_chunks (list[Document]): A list of Document objects containing text and metadata.
 
         Returns:
-            list[PointStruct]: A list of PointStruct objects ready to be inserted into Qdrant.
-        """
-        points = []
-        for chunk in process_chunks:
-            chunk_embedding = self.thai2vec.get_embedding(chunk.page_content)
-            if chunk_embedding is not None:
-                points.append(
-                    PointStruct(
-                        id=uuid.uuid4().hex,
-                        vector=chunk_embedding.tolist(),
-                        payload={
-                            "page_content": chunk.page_content,
-                            "metadata": chunk.metadata,
-                        },
-                    )
-                )
-        return points
+            tuple[list[str], np.ndarray, list[dict]]: The point ids, a contiguous float32 array of
+                                                      shape (n, vector_size) and the matching payloads.
+        """
+        return embed_chunks(process_chunks, self.thai2vec, self.vector_size)
 
-    def create_file(self, file_path: str, effective_date: str = None):
+    def upload_points(
+        self,
+        ids: list[str],
+        vectors: np.ndarray,
+        payloads: list[dict],
+        batch_size: int = 256,
+        parallel: int = 1,
+    ):
+        """
+        Uploads points to the collection from a NumPy array.
+
+        The array is handed to the client as is and sliced per batch. The client still
+        turns each batch into Python floats (`tolist()`); over REST those are then
+        JSON-encoded, so set QDRANT_GRPC_UPLOADS to send them as packed floats over gRPC.
+
+        Args:
+            ids (list[str]): The point ids.
+            vectors (np.ndarray): A float32 array of shape (n, vector_size).
+            payloads (list[dict]): The payload for each point.
+            batch_size (int, optional): Points sent per request. Defaults to 256.
+            parallel (int, optional): Number of parallel upload workers. Defaults to 1.
+        """
+        # With a throttle, send one batch at a time so the rate stays smooth.
+        step = batch_size if self.throttle else max(len(ids), 1)
+        for start in range(0, len(ids), step):
+            end = start + step
+            if self.throttle:
+                self.throttle.acquire(len(ids[start:end]))
+            self.pool.write(
+                "upsert",
+                lambda c: c.upload_collection(
+                    collection_name=self.collection_name,
+                    vectors=vectors[start:end],
+                    payload=payloads[start:end],
+                    ids=ids[start:end],
+                    batch_size=batch_size,
+                    parallel=parallel,
+                    wait=True,
+                ),
+            )
+
+    def create_file(
+        self, file_path: str, effective_date: str = None, document_id: str = None
+    ):
         """
         Loads a PDF file, processes it, and adds its chunks to Qdrant as points.
 
+        Files sharing a `document_id` are versions of the same document; only the
+        version with the latest effective date is flagged as current.
+
         Args:
             file_path (str): The file path of the PDF to process.
             effective_date (str, optional): The effective date to associate with the data.
                                              Format: "YYYY-MM-DD HH:MM:SS.ffffff".
+            document_id (str, optional): Identifies all versions of the same document.
+                                         Defaults to the file name.
         """
         try:
             if not effective_date:
@@ -176,89 +348,757 @@ class QdrantAdaptor:
             )
             effective_date_obj = datetime.now()
 
-        existing_file_path = self.list_file_path()
-
-        if file_path in existing_file_path:
+        if self.has_file(file_path):
             logging.warning(
                 f"File '{file_path}' already exists in Qdrant metadata. No action taken."
             )
             return
 
+        document_id = document_id or os.path.basename(file_path)
         self.add_documents_from_pdf(
-            file_path, effective_date_obj.strftime("%Y-%m-%d %H:%M:%S.%f")
+            file_path, effective_date_obj.strftime("%Y-%m-%d %H:%M:%S.%f"), document_id
         )
+        self.refresh_current_version(document_id)
         logging.info(f"File '{file_path}' processed and added to Qdrant.")
 
+    def refresh_current_version(self, document_id: str) -> str | None:
+        """
+        Flags the latest version of a document as current and all other versions as not current.
+
+        The new current version is switched on before the old ones are switched off, each
+        update waiting for the previous one, so retrieval never sees the document without
+        a current version. Refreshes of the same document are serialized within this
+        process, so two versions uploaded concurrently cannot leave the older one current.
+
+        Args:
+            document_id (str): The document whose versions should be updated.
+
+        Returns:
+            str | None: The source file path of the current version, or None if the document has no points.
+        """
+        with self._refresh_locks_lock:
+            lock = self._refresh_locks.setdefault(document_id, threading.Lock())
+        with lock:
+            return self._refresh_current_version(document_id)
+
+    def _refresh_current_version(self, document_id: str) -> str | None:
+        """
+        The body of `refresh_current_version`, run under the document's lock.
+        """
+        document_filter = FieldCondition(
+            key="metadata.document_id", match=MatchValue(value=document_id)
+        )
+
+        versions = {}
+        offset = None
+        while True:
+            points, offset = self.pool.read(
+                "scroll",
+                lambda c: c.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=Filter(must=[document_filter]),
+                    with_payload=["metadata.source", "metadata.effective_date"],
+                    with_vectors=False,
+                    limit=1024,
+                    offset=offset,
+                ),
+            )
+            for point in points:
+                metadata = point.payload.get("metadata") or {}
+                versions[metadata.get("source")] = metadata.get("effective_date") or ""
+            if offset is None:
+                break
+
+        if not versions:
+            return None
+
+        current_source = max(versions, key=lambda source: (versions[source], source))
+        current_filter = FieldCondition(
+            key="metadata.source", match=MatchValue(value=current_source)
+        )
+        # Separate set_payload calls rather than one batch_update_points request:
+        # local-mode Qdrant ignores SetPayload.key in batches and writes a top-level flag.
+        for is_current, flag_filter in (
+            (True, Filter(must=[document_filter, current_filter])),
+            (False, Filter(must=[document_filter], must_not=[current_filter])),
+        ):
+            self.pool.write(
+                "set_payload",
+                lambda c: c.set_payload(
+                    collection_name=self.collection_name,
+                    payload={"is_current": is_current},
+                    key="metadata",
+                    points=flag_filter,
+                    wait=True,
+                ),
+            )
+        logging.info(
+            f"Current version of document '{document_id}' is '{current_source}'."
+        )
+        return current_source
+
     def delete_file(self, file_path: str):
         """
         Deletes corresponding points with the given file_path from Qdrant.
 
+        If the file was the current version of a document, the next latest version is promoted.
+
         Args:
             file_path (str): The file path to identify and delete data points from Qdrant.
         """
         try:
-            count = self._count_point()
+            source_filter = Filter(
+                must=[
+                    FieldCondition(
+                        key="metadata.source", match=MatchValue(value=file_path)
+                    )
+                ]
+            )
+            points, _ = self.pool.read(
+                "scroll",
+                lambda c: c.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=source_filter,
+                    with_payload=["metadata.document_id"],
+                    with_vectors=False,
+                    limit=1,
+                ),
+            )
 
-            if count == 0:
-                logging.warning(f"No points found in Qdrant Collection.")
+            if not points:
+                logging.warning(
+                    f"No points found for file_path '{file_path}' in Qdrant."
+                )
                 return
 
-            points_to_delete = self.client.scroll(
-                collection_name=self.collection_name,
-                with_payload=True,
-                with_vectors=False,
-                limit=count,
+            document_id = (points[0].payload.get("metadata") or {}).get("document_id")
+            self.pool.write(
+                "delete",
+                lambda c: c.delete(
+                    collection_name=self.collection_name,
+                    points_selector=FilterSelector(filter=source_filter),
+                    wait=True,
+                ),
             )
+            logging.info(f"Points with file_path '{file_path}' deleted from Qdrant.")
+
+            if document_id:
+                self.refresh_current_version(document_id)
+        except Exception as e:
+            logging.error(f"Error deleting points with file_path '{file_path}': {e}")
+
+    def delete_file_hash(self, file_hash: str):
+        """
+        Deletes all points of the PDF with the given content hash.
 
-            point_ids_to_delete = [
-                point.id
-                for point in points_to_delete[0]
-                if point.payload.get("metadata").get("source") == file_path
+        Used to clear a partially uploaded file before it is indexed again. The document's
+        current version is refreshed afterwards. Errors are raised, since indexing the file
+        again on top of points that were not deleted would duplicate them.
+
+        Args:
+            file_hash (str): SHA-256 of the PDF content.
+        """
+        hash_filter = Filter(
+            must=[
+                FieldCondition(key="metadata.file_hash", match=MatchValue(value=file_hash))
             ]
+        )
+        points, _ = self.pool.read(
+            "scroll",
+            lambda c: c.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=hash_filter,
+                with_payload=["metadata.document_id"],
+                with_vectors=False,
+                limit=1,
+            ),
+        )
+        if not points:
+            return
+
+        document_id = (points[0].payload.get("metadata") or {}).get("document_id")
+        self.pool.write(
+            "delete",
+            lambda c: c.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(filter=hash_filter),
+                wait=True,
+            ),
+        )
+        logging.info(f"Points with file_hash '{file_hash}' deleted from Qdrant.")
+
+        if document_id:
+            self.refresh_current_version(document_id)
+
+    def has_file(self, file_path: str) -> bool:
+        """
+        Checks whether any point of the given file is stored, using the `metadata.source` index.
 
-            if point_ids_to_delete:
-                self.client.delete(
+        Args:
+            file_path (str): The file path stored in the points' metadata.
+
+        Returns:
+            bool: True if the collection holds points of the file.
+        """
+        return (
+            self.pool.read(
+                "count",
+                lambda c: c.count(
                     collection_name=self.collection_name,
-                    points_selector=point_ids_to_delete,
-                )
-                logging.info(
-                    f"Points with file_path '{file_path}' deleted from Qdrant."
-                )
-            else:
-                logging.warning(
-                    f"No points found for file_path '{file_path}' in Qdrant."
-                )
-        except Exception as e:
-            logging.error(f"Error deleting points with file_path '{file_path}': {e}")
+                    count_filter=Filter(
+                        must=[
+                            FieldCondition(
+                                key="metadata.source", match=MatchValue(value=file_path)
+                            )
+                        ]
+                    ),
+                    exact=True,
+                ),
+            ).count
+            > 0
+        )
 
     def list_file_path(self) -> list[str]:
         """
         Lists all file paths stored in Qdrant metadata.
 
+        Pages through the collection reading only `metadata.source`, so neither the
+        response size nor a single request's duration grows with the corpus.
+
         Returns:
             list[str]: A list of file paths present in Qdrant metadata.
         """
-        try:
-            count = self._count_point()
+        file_paths = set()
+        offset = None
+        while True:
+            points, offset = self.pool.read(
+                "scroll",
+                lambda c: c.scroll(
+                    collection_name=self.collection_name,
+                    with_payload=["metadata.source"],
+                    with_vectors=False,
+                    limit=1024,
+                    offset=offset,
+                ),
+            )
+            for point in points:
+                source = (point.payload.get("metadata") or {}).get("source")
+                if source:
+                    file_paths.add(source)
+            if offset is None:
+                break
+        return list(file_paths)
+
+    def list_file_hashes(self) -> set[str]:
+        """
+        Lists the content hashes of all PDFs stored in Qdrant metadata.
+
+        Pages through the collection so memory stays bounded for large corpora.
+
+        Returns:
+            set[str]: The `file_hash` values present in Qdrant metadata.
+        """
+        file_hashes = set()
+        offset = None
+        while True:
+            points, offset = self.pool.read(
+                "scroll",
+                lambda c: c.scroll(
+                    collection_name=self.collection_name,
+                    with_payload=["metadata.file_hash"],
+                    with_vectors=False,
+                    limit=1024,
+                    offset=offset,
+                ),
+            )
+            for point in points:
+                file_hash = (point.payload.get("metadata") or {}).get("file_hash")
+                if file_hash:
+                    file_hashes.add(file_hash)
+            if offset is None:
+                break
+        return file_hashes
+
+    def export_collection(self, export_dir: str, batch_size: int = 1024) -> int:
+        """
+        Exports every point of the collection to a columnar snapshot directory.
+
+        The snapshot holds `manifest.json`, `vectors.f32` (one contiguous little-endian
+        float32 block of shape (count, vector_size)) and `points.jsonl` (one
+        {"id", "payload"} record per line, in the same order as the vectors).
+        Points are paged through with scroll so memory stays bounded.
+
+        Args:
+            export_dir (str): The directory to write the snapshot into.
+            batch_size (int, optional): Points fetched per scroll request. Defaults to 1024.
+
+        Returns:
+            int: The number of exported points.
+        """
+        os.makedirs(export_dir, exist_ok=True)
+        count = 0
+        offset = None
+        with open(os.path.join(export_dir, "vectors.f32"), "wb") as vectors_file, open(
+            os.path.join(export_dir, "points.jsonl"), "w", encoding="utf-8"
+        ) as points_file:
+            while True:
+                points, offset = self.pool.read(
+                    "scroll",
+                    lambda c: c.scroll(
+                        collection_name=self.collection_name,
+                        with_payload=True,
+                        with_vectors=True,
+                        limit=batch_size,
+                        offset=offset,
+                    ),
+                )
+                if points:
+                    vectors = np.asarray(
+                        [point.vector for point in points], dtype="<f4"
+                    )
+                    if vectors.shape[1] != self.vector_size:
+                        raise ValueError(
+                            f"Expected vectors of size {self.vector_size}, got {vectors.shape[1]}."
+                        )
+                    vectors.tofile(vectors_file)
+                    for point in points:
+                        points_file.write(
+                            json.dumps(
+                                {"id": point.id, "payload": point.payload},
+                                ensure_ascii=False,
+                            )
+                            + "\n"
+                        )
+                    count += len(points)
+                if offset is None:
+                    break
+
+        with open(os.path.join(export_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "format": "medical-rag-snapshot",
+                    "version": 1,
+                    "collection": self.collection_name,
+                    "vector_size": self.vector_size,
+                    "dtype": "float32",
+                    "count": count,
+                },
+                f,
+                indent=2,
+            )
+
+        logging.info(
+            f"Exported {count} points from '{self.collection_name}' to '{export_dir}'."
+        )
+        return count
+
+    def import_collection(
+        self, export_dir: str, batch_size: int = 1024, parallel: int = 1
+    ) -> int:
+        """
+        Bulk-loads a snapshot written by `export_collection` into the collection.
 
-            if count == 0:
-                logging.warning(f"No points found in Qdrant Collection.")
-                return []
+        The vector block is memory-mapped and `points.jsonl` is read line by line into
+        one streaming `upload_points` call, so the client's upload workers start once
+        and only the batches in flight are held in memory. With a throttle set, each
+        batch waits for its share of the rate.
+
+        Args:
+            export_dir (str): The snapshot directory.
+            batch_size (int, optional): Points per upsert request. Defaults to 1024.
+            parallel (int, optional): Number of parallel upload workers. Defaults to 1.
 
-            points = self.client.scroll(
+        Returns:
+            int: The number of imported points.
+        """
+        with open(os.path.join(export_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if manifest.get("format") != "medical-rag-snapshot":
+            raise ValueError(f"'{export_dir}' is not a medical-rag snapshot.")
+        if manifest["vector_size"] != self.vector_size:
+            raise ValueError(
+                f"Snapshot vector size {manifest['vector_size']} does not match "
+                f"collection vector size {self.vector_size}."
+            )
+
+        count = manifest["count"]
+        if count == 0:
+            logging.warning(f"Snapshot '{export_dir}' is empty.")
+            return 0
+
+        vectors = np.memmap(
+            os.path.join(export_dir, "vectors.f32"),
+            dtype="<f4",
+            mode="r",
+            shape=(count, manifest["vector_size"]),
+        )
+        imported = 0
+
+        def points():
+            nonlocal imported
+            with open(os.path.join(export_dir, "points.jsonl"), encoding="utf-8") as f:
+                for i, line in enumerate(f):
+                    if self.throttle and i % batch_size == 0:
+                        self.throttle.acquire(min(batch_size, count - i))
+                    record = json.loads(line)
+                    yield PointStruct(
+                        id=record["id"],
+                        vector=vectors[i].tolist(),
+                        payload=record["payload"],
+                    )
+                    imported += 1
+
+        self.pool.write(
+            "bulk_upload",
+            lambda c: c.upload_points(
                 collection_name=self.collection_name,
-                with_payload=True,
-                with_vectors=False,
-                limit=count,
+                points=points(),
+                batch_size=batch_size,
+                parallel=parallel,
+                wait=True,
+            ),
+        )
+
+        logging.info(
+            f"Imported {imported} points from '{export_dir}' into '{self.collection_name}'."
+        )
+        return imported
+
+    @property
+    def previous_alias(self) -> str:
+        """
+        The alias that remembers which collection `collection_name` pointed to before the last swap.
+        """
+        return f"{self.collection_name}__previous"
+
+    def _aliases(self) -> dict:
+        """
+        Lists every alias of the Qdrant instance.
+
+        Returns:
+            dict: {alias name: collection name}.
+        """
+        aliases = self.pool.read("get_aliases", lambda c: c.get_aliases()).aliases
+        return {alias.alias_name: alias.collection_name for alias in aliases}
+
+    def resolve_alias(self) -> str | None:
+        """
+        Finds the collection that `collection_name` points to when it is an alias.
+
+        Returns:
+            str | None: The aliased collection, or None if `collection_name` is not an alias.
+        """
+        return self._aliases().get(self.collection_name)
+
+    def list_collection_versions(self) -> list[str]:
+        """
+        Lists the versioned collections built by `rebuild_collection`, oldest first.
+
+        Returns:
+            list[str]: Collection names of the form "<collection_name>__<timestamp>".
+        """
+        collections = self.pool.read(
+            "get_collections", lambda c: c.get_collections()
+        ).collections
+        prefix = f"{self.collection_name}__"
+        return sorted(c.name for c in collections if c.name.startswith(prefix))
+
+    def check_alias_swap(self, replace_collection: bool = False) -> bool:
+        """
+        Checks that `collection_name` can be pointed at a new collection.
+
+        Called before a rebuild starts, so a rebuild that could never be swapped in
+        fails immediately instead of after the whole build.
+
+        Args:
+            replace_collection (bool, optional): See `swap_alias`.
+
+        Returns:
+            bool: True if `collection_name` is a physical collection that the swap will delete.
+
+        Raises:
+            ValueError: If `collection_name` is a physical collection and `replace_collection` is False.
+        """
+        if self.resolve_alias() is not None:
+            return False
+        if not self.pool.read(
+            "collection_exists", lambda c: c.collection_exists(self.collection_name)
+        ):
+            return False
+        if not replace_collection:
+            raise ValueError(
+                f"'{self.collection_name}' is a collection, not an alias. "
+                "Pass replace_collection=True to migrate it to an alias."
+            )
+        return True
+
+    def swap_alias(self, target_collection: str, replace_collection: bool = False):
+        """
+        Atomically points the `collection_name` alias at another collection.
+
+        The alias removal and creation are sent in one request, so readers always
+        see either the old or the new collection. The same request points
+        `previous_alias` at the old collection for `rollback_alias`. The collection
+        `previous_alias` pointed to until then is deleted afterwards, so only the live
+        collection and one previous version are kept.
+
+        Args:
+            target_collection (str): The collection the alias should point to.
+            replace_collection (bool, optional): Allow deleting a physical collection that still
+                                                 uses `collection_name` (one-time migration to an
+                                                 alias; the deleted collection cannot be rolled back to).
+
+        Raises:
+            ValueError: If `collection_name` is a physical collection and `replace_collection` is False.
+        """
+        aliases = self._aliases()
+        current = aliases.get(self.collection_name)
+        expired = aliases.get(self.previous_alias) if current else None
+        operations = []
+        if current:
+            operations.append(
+                DeleteAliasOperation(
+                    delete_alias=DeleteAlias(alias_name=self.collection_name)
+                )
+            )
+            if self.previous_alias in aliases:
+                operations.append(
+                    DeleteAliasOperation(
+                        delete_alias=DeleteAlias(alias_name=self.previous_alias)
+                    )
+                )
+            operations.append(
+                CreateAliasOperation(
+                    create_alias=CreateAlias(
+                        collection_name=current, alias_name=self.previous_alias
+                    )
+                )
+            )
+        elif self.check_alias_swap(replace_collection):
+            logging.warning(
+                f"Deleting physical collection '{self.collection_name}' to replace it with an alias."
+            )
+            self.pool.write(
+                "delete_collection",
+                lambda c: c.delete_collection(self.collection_name),
+            )
+
+        operations.append(
+            CreateAliasOperation(
+                create_alias=CreateAlias(
+                    collection_name=target_collection, alias_name=self.collection_name
+                )
+            )
+        )
+        self.pool.write(
+            "update_aliases",
+            lambda c: c.update_collection_aliases(change_aliases_operations=operations),
+        )
+        logging.info(
+            f"Alias '{self.collection_name}' now points to '{target_collection}' "
+            f"(was '{current}')."
+        )
+
+        if expired and expired not in (target_collection, current):
+            self.pool.write(
+                "delete_collection", lambda c: c.delete_collection(expired)
+            )
+            logging.info(f"Deleted expired version '{expired}'.")
+
+    def rollback_alias(self) -> str:
+        """
+        Points the alias back to the collection it pointed to before the last swap.
+
+        The rollback is itself a swap, so a second rollback undoes the first.
+
+        Returns:
+            str: The collection the alias now points to.
+
+        Raises:
+            ValueError: If no previous collection was recorded, or it no longer exists.
+        """
+        previous = self._aliases().get(self.previous_alias)
+        if not previous:
+            raise ValueError(f"No previous version of '{self.collection_name}' to roll back to.")
+        self.swap_alias(previous)
+        return previous
+
+    def _list_sources(self) -> dict:
+        """
+        Lists the stored PDFs with the version metadata needed to re-ingest them.
+
+        Returns:
+            dict: {source: {"effective_date", "document_id"}} for every file in the collection.
+        """
+        sources = {}
+        offset = None
+        while True:
+            points, offset = self.pool.read(
+                "scroll",
+                lambda c: c.scroll(
+                    collection_name=self.collection_name,
+                    with_payload=[
+                        "metadata.source",
+                        "metadata.effective_date",
+                        "metadata.document_id",
+                    ],
+                    with_vectors=False,
+                    limit=1024,
+                    offset=offset,
+                ),
             )
-            file_path = set(
-                [point.payload.get("metadata").get("source") for point in points[0]]
+            for point in points:
+                metadata = point.payload.get("metadata") or {}
+                sources.setdefault(
+                    metadata.get("source"),
+                    {
+                        "effective_date": metadata.get("effective_date"),
+                        "document_id": metadata.get("document_id"),
+                    },
+                )
+            if offset is None:
+                break
+        return sources
+
+    def _update_rebuild_status(self, **fields):
+        """
+        Updates the rebuild progress and logs it.
+        """
+        self.rebuild_status.update(fields)
+        elapsed = time.perf_counter() - self.rebuild_status.get("_start", time.perf_counter())
+        if elapsed > 0 and self.rebuild_status.get("points"):
+            self.rebuild_status["points_per_second"] = round(
+                self.rebuild_status["points"] / elapsed, 1
             )
-            logging.info(f"file_path in Qdrant metadata: {file_path}")
-            return list(file_path)
+        logging.info(
+            "Rebuild progress: "
+            + ", ".join(f"{k}={v}" for k, v in self.rebuild_status.items() if not k.startswith("_"))
+        )
+
+    def rebuild_collection(
+        self,
+        export_dir: str | None = None,
+        max_points_per_second: float | None = None,
+        replace_collection: bool = False,
+    ) -> str:
+        """
+        Builds a new versioned collection in the background and swaps the alias to it.
+
+        The new collection "<collection_name>__<timestamp>" is filled either from the
+        stored PDFs of the live collection (re-parsed, re-chunked and re-embedded with the
+        current settings) or from a snapshot written by `export_collection`. Uploads are
+        capped at `max_points_per_second` so the live collection keeps serving queries.
+        Files added to or deleted from the live collection while the rebuild runs are
+        caught up before the alias is swapped. The previous version is kept for
+        `rollback_alias`; a failed build is deleted.
+
+        Args:
+            export_dir (str | None, optional): Rebuild from this snapshot instead of the PDFs.
+            max_points_per_second (float | None, optional): The upload throughput cap.
+            replace_collection (bool, optional): See `swap_alias`.
+
+        Returns:
+            str: The name of the new collection.
+        """
+        target = copy.copy(self)
+        target.collection_name = (
+            f"{self.collection_name}__{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        )
+        target.throttle = Throttle(max_points_per_second) if max_points_per_second else None
+
+        self.rebuild_status = {
+            "state": "building",
+            "collection": target.collection_name,
+            "source": export_dir or "pdf",
+            "done": 0,
+            "total": None,
+            "points": 0,
+            "_start": time.perf_counter(),
+        }
+        created = False
+        try:
+            self.check_alias_swap(replace_collection)
+            target.create_collection(self.vector_size)
+            created = True
+
+            if export_dir:
+                self._update_rebuild_status(
+                    points=target.import_collection(export_dir), done=1, total=1
+                )
+            else:
+                sources = self._list_sources()
+                self._update_rebuild_status(total=len(sources))
+                self._rebuild_from_pdfs(target, sources)
+                target.throttle = None
+                self._catch_up(target, sources)
+
+            self.swap_alias(target.collection_name, replace_collection)
+            self._update_rebuild_status(state="done")
         except Exception as e:
-            logging.error(f"Error retrieving file_path from Qdrant metadata: {e}")
-            return []
+            if created:
+                self.pool.write(
+                    "delete_collection",
+                    lambda c: c.delete_collection(target.collection_name),
+                )
+            self._update_rebuild_status(state="failed", error=str(e))
+            raise
+        return target.collection_name
+
+    def _catch_up(self, target: "QdrantAdaptor", ingested: dict):
+        """
+        Applies files added to or deleted from the live collection during a rebuild.
+
+        Passes repeat until the live collection stops changing (at most
+        `CATCH_UP_PASSES` times), so only changes made in the moment between the last
+        scan and the alias swap can be missed.
+
+        Args:
+            target (QdrantAdaptor): The adaptor for the collection being built.
+            ingested (dict): {source: {"effective_date", "document_id"}} already in the target.
+        """
+        ingested = dict(ingested)
+        for _ in range(self.CATCH_UP_PASSES):
+            live = self._list_sources()
+            added = {
+                source: info for source, info in live.items() if source not in ingested
+            }
+            removed = [source for source in ingested if source not in live]
+            if not added and not removed:
+                return
+
+            for source in removed:
+                target.delete_file(source)
+                del ingested[source]
+            if added:
+                self._update_rebuild_status(total=self.rebuild_status["total"] + len(added))
+                self._rebuild_from_pdfs(target, added)
+                ingested.update(added)
+
+    def _rebuild_from_pdfs(self, target: "QdrantAdaptor", sources: dict):
+        """
+        Re-ingests stored PDFs into the rebuild target and restores their current-version flags.
+
+        Args:
+            target (QdrantAdaptor): The adaptor for the collection being built.
+            sources (dict): {source: {"effective_date", "document_id"}} to ingest.
+        """
+        for source, info in sources.items():
+            points = 0
+            if source and os.path.exists(source):
+                points = target.add_documents_from_pdf(
+                    source, info["effective_date"], info["document_id"]
+                )
+            else:
+                logging.warning(f"Stored PDF '{source}' not found, skipping it in the rebuild.")
+            self._update_rebuild_status(
+                done=self.rebuild_status["done"] + 1,
+                points=self.rebuild_status["points"] + points,
+            )
+
+        for document_id in {info["document_id"] for info in sources.values()}:
+            if document_id:
+                target.refresh_current_version(document_id)
 
     def _count_point(self) -> int:
         """
@@ -267,9 +1107,111 @@ class QdrantAdaptor:
         Returns:
             int: The number of points in the collection.
         """
-        count = self.client.count(
-            collection_name=self.collection_name,
-            exact=True,
+        count = self.pool.read(
+            "count",
+            lambda c: c.count(
+                collection_name=self.collection_name,
+                exact=True,
+            ),
         ).count
 
         return count
+
+
+def load_pdf_chunks(
+    pdf_path: str,
+    effective_date: str,
+    text_cleaner: TextCleaner,
+    file_hash: str | None = None,
+    extraction_cache: PdfExtractionCache | None = None,
+    document_id: str | None = None,
+    chunker: ThaiTokenChunker | None = None,
+) -> list["Document"]:
+    """
+    Loads a PDF, splits it into chunks and cleans each chunk.
+
+    Kept at module level so worker processes can parse PDFs without a Qdrant connection.
+
+    Args:
+        pdf_path (str): The file path of the PDF to process.
+        effective_date (str): The effective date stored in every chunk's metadata.
+        text_cleaner (TextCleaner): Service used to preprocess the chunk text.
+        file_hash (str | None, optional): SHA-256 of the PDF content stored as `file_hash`.
+        extraction_cache (PdfExtractionCache | None, optional): Cache of extracted pages.
+                                                                PDFs are parsed directly when omitted.
+        document_id (str | None, optional): Identifies all versions of the same document.
+                                            Defaults to the file name.
+        chunker (ThaiTokenChunker | None, optional): Splits the pages into chunks.
+                                                     Defaults to `ThaiTokenChunker.from_env()`.
+
+    Returns:
+        list[Document]: The cleaned chunks with page, source, date and version metadata.
+                        `is_current` starts as False until the version is promoted.
+    """
+    from langchain_core.documents import Document
+
+    if extraction_cache:
+        documents = extraction_cache.load(pdf_path, file_hash)
+    else:
+        from langchain_community.document_loaders import PyPDFLoader
+
+        loader = PyPDFLoader(pdf_path)
+        documents = loader.load()
+
+    chunker = chunker or ThaiTokenChunker.from_env()
+    chunks = chunker.split_documents(documents)
+
+    process_chunks = []
+    for c in chunks:
+        page_content = text_cleaner.preprocess_text(c.page_content)
+        metadata_with_date = c.metadata.copy()
+        metadata_with_date["effective_date"] = effective_date
+        metadata_with_date["document_id"] = document_id or os.path.basename(pdf_path)
+        metadata_with_date["is_current"] = False
+        if file_hash:
+            metadata_with_date["file_hash"] = file_hash
+        process_chunks.append(
+            Document(page_content=page_content, metadata=metadata_with_date)
+        )
+    return process_chunks
+
+
+def embed_chunks(
+    process_chunks: list["Document"], thai2vec: Thai2VecEmbedder, vector_size: int
+) -> tuple[list[str], np.ndarray, list[dict]]:
+    """
+    Embeds chunks into a contiguous float32 array ready for `QdrantAdaptor.upload_points`.
+
+    Chunks without any known token are dropped.
+
+    Args:
+        process_chunks (list[Document]): A list of Document objects containing text and metadata.
+        thai2vec (Thai2VecEmbedder): Embedding generator for the chunk text.
+        vector_size (int): The size of the vector embeddings.
+
+    Returns:
+        tuple[list[str], np.ndarray, list[dict]]: The point ids, an array of shape
+                                                  (n, vector_size) and the matching payloads.
+    """
+    ids = []
+    embeddings = []
+    payloads = []
+    chunk_embeddings = thai2vec.embed_documents(
+        [chunk.page_content for chunk in process_chunks]
+    )
+    for chunk, chunk_embedding in zip(process_chunks, chunk_embeddings):
+        if chunk_embedding is not None:
+            ids.append(uuid.uuid4().hex)
+            embeddings.append(chunk_embedding)
+            payloads.append(
+                {
+                    "page_content": chunk.page_content,
+                    "metadata": chunk.metadata,
+                }
+            )
+
+    if embeddings:
+        vectors = np.ascontiguousarray(np.stack(embeddings), dtype=np.float32)
+    else:
+        vectors = np.empty((0, vector_size), dtype=np.float32)
+    return ids, vectors, payloads
@@ -0,0 +1,514 @@
+import asyncio
+import itertools
+import logging
+import math
+import random
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+
+class LatencyHistogram:
+    """
+    A thread-safe latency histogram with fixed millisecond buckets.
+
+    Attributes:
+        counts (list[int]): The number of observations per bucket.
+        count (int): The total number of observations.
+        total_seconds (float): The sum of all observed latencies.
+    """
+
+    BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+    def __init__(self):
+        """
+        Initialize an empty LatencyHistogram.
+        """
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """
+        Record one latency.
+
+        Args:
+            seconds (float): The observed latency in seconds.
+        """
+        index = bisect_left(self.BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_seconds += seconds
+
+    def percentile(self, q: float) -> float | None:
+        """
+        Estimate a latency percentile as the upper bound of the bucket that contains it.
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            float | None: The latency in seconds, or None if nothing was observed.
+        """
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = q / 100 * self.count
+            cumulative = 0
+            for index, bucket_count in enumerate(self.counts):
+                cumulative += bucket_count
+                if cumulative >= rank:
+                    break
+        if index == len(self.BUCKETS_MS):
+            return self.BUCKETS_MS[-1] / 1000 * 2
+        return self.BUCKETS_MS[index] / 1000
+
+    def snapshot(self) -> dict:
+        """
+        Describe the histogram.
+
+        Returns:
+            dict: The bucket counts keyed by upper bound ("+Inf" for the last one), count, mean and percentiles.
+        """
+        with self._lock:
+            buckets = {
+                f"le_{bound}ms": bucket_count
+                for bound, bucket_count in zip(self.BUCKETS_MS, self.counts)
+            }
+            buckets["+Inf"] = self.counts[-1]
+            count = self.count
+            mean = self.total_seconds / count if count else None
+        return {
+            "count": count,
+            "mean_seconds": mean,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "p99_seconds": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether a failed idempotent Qdrant call is worth retrying.
+
+    Timeouts, connection problems, rate limiting and 5xx responses are retryable;
+    anything else (bad requests, missing collections) is not.
+
+    Args:
+        error (Exception): The raised error.
+
+    Returns:
+        bool: True if the call may be retried.
+    """
+    if isinstance(error, (TimeoutError, FutureTimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in (
+        "ResponseHandlingException",
+        "TransportError",
+        "ConnectError",
+        "ReadTimeout",
+    ):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code in (429, 500, 502, 503, 504)
+
+
+class QdrantPool:
+    """
+    A pooled, resilient access layer over several Qdrant clients.
+
+    Reads are idempotent, so they get a per-operation timeout, retries with jittered
+    exponential backoff and a hedged duplicate request on another client when the first
+    one is slower than the operation's observed p95. Writes get the timeout only.
+    Latency histograms are kept per operation.
+
+    A timed-out call cannot be interrupted, so it keeps its thread until the client's own
+    HTTP timeout fires. Read clients are therefore built with an HTTP timeout close to the
+    read timeouts, the long-running uploads go through a separate write client and executor,
+    and reads go to the client with the fewest calls in flight, so a stuck replica stops
+    receiving traffic instead of filling the executor.
+
+    Attributes:
+        clients (list): The synchronous read clients; the first one is also exposed as `client`.
+        write_client: The synchronous client used by `write`, with a timeout long enough for uploads.
+        timeouts (dict): Per-operation timeouts in seconds ("default" is the fallback).
+        retries (int): Extra attempts for a failed read.
+        backoff (float): The base backoff delay in seconds.
+        hedge_min_delay (float): The minimum delay before a hedged request is sent.
+        histograms (dict[str, LatencyHistogram]): Latency histograms keyed by operation.
+        counters (dict[str, int]): Counts of hedged requests, retries, timeouts and errors.
+    """
+
+    DEFAULT_TIMEOUTS = {
+        "default": 30.0,
+        "query": 2.0,
+        "query_batch": 3.0,
+        "count": 10.0,
+        "scroll": 30.0,
+        "upsert": 300.0,
+        # A streaming upload of a whole snapshot: no overall limit, each request
+        # is still bounded by the write client's HTTP timeout.
+        "bulk_upload": None,
+    }
+    # Operations only ever sent through `write`; their timeouts do not bound the read clients.
+    WRITE_ONLY_OPERATIONS = ("upsert", "bulk_upload")
+
+    def __init__(
+        self,
+        url: str | None = None,
+        api_key: str | None = None,
+        size: int = 2,
+        timeouts: dict | None = None,
+        retries: int = 2,
+        backoff: float = 0.1,
+        hedge_min_delay: float = 0.05,
+        clients: list | None = None,
+        async_clients: list | None = None,
+        write_client=None,
+        prefer_grpc_writes: bool = False,
+    ):
+        """
+        Initialize the QdrantPool.
+
+        Args:
+            url (str | None, optional): The Qdrant URL, used when `clients` is not given.
+            api_key (str | None, optional): The Qdrant API key.
+            size (int, optional): Number of clients to create. Defaults to 2.
+            timeouts (dict | None, optional): Overrides for `DEFAULT_TIMEOUTS`.
+            retries (int, optional): Extra attempts for a failed read. Defaults to 2.
+            backoff (float, optional): The base backoff delay in seconds. Defaults to 0.1.
+            hedge_min_delay (float, optional): The minimum hedge delay in seconds. Defaults to 0.05.
+            clients (list | None, optional): Already constructed synchronous clients to pool.
+            async_clients (list | None, optional): Already constructed asynchronous clients to pool.
+            write_client (optional): An already constructed client for writes.
+                                     Defaults to a new long-timeout client, or to the
+                                     first of `clients` when those are given.
+            prefer_grpc_writes (bool, optional): Build the write client with gRPC, which sends
+                                                 vectors as packed floats instead of JSON text.
+                                                 Needs the gRPC port (6334). Defaults to False.
+        """
+        self.url = url
+        self.api_key = api_key
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_min_delay = hedge_min_delay
+
+        if clients is None:
+            from qdrant_client import QdrantClient
+
+            clients = [
+                QdrantClient(url=url, api_key=api_key, timeout=self.read_client_timeout)
+                for _ in range(size)
+            ]
+            if write_client is None:
+                write_client = QdrantClient(
+                    url=url,
+                    api_key=api_key,
+                    timeout=math.ceil(
+                        max(t for t in self.timeouts.values() if t is not None)
+                    ),
+                    prefer_grpc=prefer_grpc_writes,
+                )
+        self.clients = clients
+        self.write_client = write_client if write_client is not None else clients[0]
+        self._async_clients = async_clients
+        self._round_robin = itertools.count()
+        self._in_flight = [0] * len(clients)
+        # Abandoned reads hold a thread for up to `read_client_timeout`, so leave plenty of headroom.
+        self._executor = ThreadPoolExecutor(max_workers=max(len(clients), 1) * 16)
+        self._write_executor = ThreadPoolExecutor(max_workers=4)
+
+        self.histograms = {}
+        self.counters = {"hedged": 0, "retries": 0, "timeouts": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """
+        The primary synchronous client, for callers that need the raw client.
+        """
+        return self.clients[0]
+
+    @property
+    def read_client_timeout(self) -> int:
+        """
+        The HTTP timeout of the read clients: the longest read timeout, rounded up.
+        """
+        return math.ceil(
+            max(
+                timeout
+                for operation, timeout in self.timeouts.items()
+                if operation not in self.WRITE_ONLY_OPERATIONS
+            )
+        )
+
+    @property
+    def async_clients(self) -> list:
+        """
+        The asynchronous clients, created on first use.
+        """
+        if self._async_clients is None:
+            from qdrant_client import AsyncQdrantClient
+
+            self._async_clients = [
+                AsyncQdrantClient(
+                    url=self.url, api_key=self.api_key, timeout=self.read_client_timeout
+                )
+                for _ in self.clients
+            ]
+        return self._async_clients
+
+    def _pick(self, count: int, in_flight: list | None = None) -> tuple:
+        """
+        Pick a primary client and a hedge client.
+
+        Clients are taken round-robin. When `in_flight` is given, the clients with the
+        fewest calls in flight come first, so a replica that is holding abandoned calls is
+        skipped while a healthy one is available.
+
+        Args:
+            count (int): The number of clients.
+            in_flight (list | None, optional): The calls in flight per client.
+
+        Returns:
+            tuple: The indexes of the primary client and the hedge client.
+        """
+        start = next(self._round_robin) % count
+        order = [(start + i) % count for i in range(count)]
+        if in_flight is not None:
+            with self._lock:
+                order.sort(key=lambda index: in_flight[index])
+        return order[0], order[1 % count]
+
+    def _submit(self, index: int, fn):
+        """
+        Run `fn` on a read client in the executor, counting it as in flight until it ends.
+        """
+        with self._lock:
+            self._in_flight[index] += 1
+
+        def release(_):
+            with self._lock:
+                self._in_flight[index] -= 1
+
+        future = self._executor.submit(fn, self.clients[index])
+        future.add_done_callback(release)
+        return future
+
+    def _histogram(self, operation: str) -> LatencyHistogram:
+        with self._lock:
+            if operation not in self.histograms:
+                self.histograms[operation] = LatencyHistogram()
+            return self.histograms[operation]
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def timeout_for(self, operation: str) -> float:
+        """
+        The timeout of an operation in seconds.
+
+        Args:
+            operation (str): The operation name.
+
+        Returns:
+            float | None: The configured timeout, or the default one. None means no limit.
+        """
+        return self.timeouts.get(operation, self.timeouts["default"])
+
+    def hedge_delay(self, operation: str) -> float:
+        """
+        How long to wait for a read before sending a hedged duplicate.
+
+        Args:
+            operation (str): The operation name.
+
+        Returns:
+            float: The observed p95 latency (at least `hedge_min_delay`), or half the
+                   timeout when nothing has been observed yet.
+        """
+        p95 = self._histogram(operation).percentile(95)
+        if p95 is None:
+            return self.timeout_for(operation) / 2
+        return max(p95, self.hedge_min_delay)
+
+    def _backoff_sleep(self, attempt: int) -> float:
+        """
+        Jittered exponential backoff delay for a retry attempt.
+        """
+        return self.backoff * (2**attempt) * random.uniform(0.5, 1.5)
+
+    def _hedged_call(self, operation: str, fn):
+        """
+        Run one read attempt, hedging it on a second client if it is slow.
+        """
+        timeout = self.timeout_for(operation)
+        start = time.perf_counter()
+        primary, hedge = self._pick(len(self.clients), self._in_flight)
+        futures = [self._submit(primary, fn)]
+
+        done, _ = wait(futures, timeout=min(self.hedge_delay(operation), timeout))
+        if not done and len(self.clients) > 1:
+            self._count("hedged")
+            futures.append(self._submit(hedge, fn))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    self._histogram(operation).observe(time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+
+        if error is not None and not pending:
+            raise error
+        self._count("timeouts")
+        raise TimeoutError(f"Qdrant operation '{operation}' timed out after {timeout}s.")
+
+    def read(self, operation: str, fn):
+        """
+        Run an idempotent read with timeout, hedging and jittered retries.
+
+        Args:
+            operation (str): The operation name, used for timeouts and histograms.
+            fn (callable): Called with a client, e.g. `lambda c: c.count(...)`.
+
+        Returns:
+            The value returned by `fn`.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return self._hedged_call(operation, fn)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    self._count("errors")
+                    raise
+                self._count("retries")
+                delay = self._backoff_sleep(attempt)
+                logging.warning(
+                    f"Qdrant '{operation}' failed ({e!r}), retrying in {delay:.2f}s."
+                )
+                time.sleep(delay)
+
+    def write(self, operation: str, fn):
+        """
+        Run a write on the write client with a timeout and no retries.
+
+        Args:
+            operation (str): The operation name, used for timeouts and histograms.
+            fn (callable): Called with a client, e.g. `lambda c: c.upsert(...)`.
+
+        Returns:
+            The value returned by `fn`.
+        """
+        start = time.perf_counter()
+        future = self._write_executor.submit(fn, self.write_client)
+        try:
+            result = future.result(timeout=self.timeout_for(operation))
+        except (TimeoutError, FutureTimeoutError):
+            self._count("timeouts")
+            raise TimeoutError(
+                f"Qdrant operation '{operation}' timed out after {self.timeout_for(operation)}s."
+            )
+        except Exception:
+            self._count("errors")
+            raise
+        self._histogram(operation).observe(time.perf_counter() - start)
+        return result
+
+    async def _async_hedged_call(self, operation: str, fn):
+        """
+        Run one asynchronous read attempt, hedging it on a second client if it is slow.
+        """
+        clients = self.async_clients
+        timeout = self.timeout_for(operation)
+        start = time.perf_counter()
+        primary, hedge = self._pick(len(clients))
+        tasks = [asyncio.ensure_future(fn(clients[primary]))]
+
+        try:
+            done, _ = await asyncio.wait(
+                tasks, timeout=min(self.hedge_delay(operation), timeout)
+            )
+            if not done and len(clients) > 1:
+                self._count("hedged")
+                tasks.append(asyncio.ensure_future(fn(clients[hedge])))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                remaining = timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self._histogram(operation).observe(time.perf_counter() - start)
+                        return task.result()
+                    error = task.exception()
+
+            if error is not None and not pending:
+                raise error
+            self._count("timeouts")
+            raise TimeoutError(
+                f"Qdrant operation '{operation}' timed out after {timeout}s."
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def aread(self, operation: str, fn):
+        """
+        Asynchronous counterpart of `read`, using the pooled asynchronous clients.
+
+        Args:
+            operation (str): The operation name, used for timeouts and histograms.
+            fn (callable): Called with an async client and returning an awaitable,
+                           e.g. `lambda c: c.query_points(...)`.
+
+        Returns:
+            The value the awaitable resolves to.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._async_hedged_call(operation, fn)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    self._count("errors")
+                    raise
+                self._count("retries")
+                await asyncio.sleep(self._backoff_sleep(attempt))
+
+    def metrics(self) -> dict:
+        """
+        Describe the pool's latency histograms and counters.
+
+        Returns:
+            dict: The per-operation histogram snapshots and the counters.
+        """
+        with self._lock:
+            histograms = dict(self.histograms)
+            counters = dict(self.counters)
+        return {
+            "operations": {
+                operation: histogram.snapshot()
+                for operation, histogram in histograms.items()
+            },
+            "counters": counters,
+        }
@@ -1,21 +1,352 @@
+import asyncio
+import hmac
 import json
 import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, HTTPException, UploadFile, WebSocket
-from adaptors.qdrant_adaptors import QdrantAdaptor
-from services.chatbot import Chatbot
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    UploadFile,
+    WebSocket,
+)
+from fastapi.responses import JSONResponse
 from starlette.websockets import WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-# Create a FastAPI instance
-app = FastAPI()
 load_dotenv(override=True)
-collection_name = os.getenv("COLLECTION_NAME")
+# COLLECTIONS lists every knowledge base this process may serve; COLLECTION_NAME is the default.
+allowed_collections = [
+    name.strip() for name in os.getenv("COLLECTIONS", "").split(",") if name.strip()
+]
+collection_name = os.getenv("COLLECTION_NAME") or (
+    allowed_collections[0] if allowed_collections else None
+)
+if collection_name and collection_name not in allowed_collections:
+    allowed_collections.insert(0, collection_name)
+quantization = os.getenv("QDRANT_QUANTIZATION") or None
+oversampling = float(os.getenv("QDRANT_OVERSAMPLING", "0")) or None
+warm_up_wait_seconds = float(os.getenv("WARM_UP_WAIT_SECONDS", "60"))
+reindex_max_points_per_second = float(
+    os.getenv("REINDEX_MAX_POINTS_PER_SECOND", "200")
+)
+chat_history_tokens = int(os.getenv("CHAT_HISTORY_TOKENS", "3000"))
+chat_keep_turns = int(os.getenv("CHAT_KEEP_TURNS", "3"))
+# The /admin endpoints are disabled unless ADMIN_TOKEN is set.
+admin_token = os.getenv("ADMIN_TOKEN")
+snapshot_root = os.path.realpath(os.getenv("SNAPSHOT_ROOT", "./snapshots"))
+
+
+class ServiceRegistry:
+    """
+    Class for lazily constructing the Qdrant adaptors and chatbots of each collection.
+
+    The heavy modules (LangChain, LangGraph, PyThaiNLP, gensim) and the thai2fit model are
+    only loaded by `warm_up`, which runs in a worker thread after the server has started,
+    so workers bind their port immediately and report their progress through the health endpoints.
+
+    Warm-up builds the default collection's services. Other collections get their own adaptor
+    and chatbot (graph, LLM cache, metrics) on first use, sharing the default collection's
+    embedder and Qdrant client pool.
+    """
+
+    def __init__(self):
+        """
+        Initialize the ServiceRegistry in the "starting" state.
+
+        Attributes:
+            status (str): One of "starting", "warming", "ready" or "failed".
+            error (str | None): The warm-up error message, if warm-up failed.
+            timings (dict): Seconds spent in each warm-up step.
+            collections (dict): Per collection name, its "qdrant_adaptor" and "chatbot"
+                                (None until the first chat on that collection).
+        """
+        self.status = "starting"
+        self.error = None
+        self.timings = {}
+        self.collections = {}
+        self._modules = None
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def _timed(self, step: str, fn):
+        """
+        Run one warm-up step and record its duration.
+
+        Args:
+            step (str): The step name used as key in `timings`.
+            fn (callable): The step to run.
+
+        Returns:
+            The value returned by `fn`.
+        """
+        start = time.perf_counter()
+        result = fn()
+        self.timings[step] = round(time.perf_counter() - start, 3)
+        return result
 
-qdrant_adaptor = QdrantAdaptor(collection_name)
-qrant_client = qdrant_adaptor.client
-chatbot = Chatbot(qrant_client, collection_name)
+    def warm_up(self):
+        """
+        Import the heavy modules, construct the services and load the word vector model.
+        """
+        self.status = "warming"
+
+        def import_modules():
+            from adaptors.qdrant_adaptors import QdrantAdaptor
+            from services.chatbot import Chatbot
+
+            return QdrantAdaptor, Chatbot
+
+        self._modules = self._timed("import_modules", import_modules)
+        QdrantAdaptor, _ = self._modules
+        qdrant_adaptor = self._timed(
+            "qdrant_adaptor",
+            lambda: QdrantAdaptor(collection_name, quantization=quantization),
+        )
+        self._timed("thai2fit_model", qdrant_adaptor.thai2vec.load)
+        chatbot = self._timed("chatbot", lambda: self._create_chatbot(qdrant_adaptor))
+
+        self.collections[collection_name] = {
+            "qdrant_adaptor": qdrant_adaptor,
+            "chatbot": chatbot,
+        }
+        self.status = "ready"
+
+    def _create_chatbot(self, qdrant_adaptor):
+        """
+        Construct a chatbot for the adaptor's collection, sharing its pool and embedder.
+
+        Args:
+            qdrant_adaptor (QdrantAdaptor): The adaptor of the collection.
+
+        Returns:
+            Chatbot: The new chatbot.
+        """
+        _, Chatbot = self._modules
+        return Chatbot(
+            qdrant_adaptor.pool,
+            qdrant_adaptor.collection_name,
+            oversampling=oversampling,
+            thai2vec=qdrant_adaptor.thai2vec,
+            history_token_limit=chat_history_tokens,
+            keep_turns=chat_keep_turns,
+        )
+
+    def _services_for(self, collection: str | None) -> dict:
+        """
+        Get the services of a collection, constructing its adaptor on first use.
+
+        Args:
+            collection (str | None): The collection name. Defaults to COLLECTION_NAME.
+
+        Returns:
+            dict: The collection's "qdrant_adaptor" and "chatbot" entry.
+
+        Raises:
+            HTTPException: If the services are not ready or the collection is not allowed.
+        """
+        self.require_ready()
+        collection = resolve_collection(collection)
+        with self._lock:
+            if collection not in self.collections:
+                QdrantAdaptor, _ = self._modules
+                shared = self.collections[collection_name]["qdrant_adaptor"]
+                self.collections[collection] = {
+                    "qdrant_adaptor": QdrantAdaptor(
+                        collection,
+                        quantization=quantization,
+                        thai2vec=shared.thai2vec,
+                        pool=shared.pool,
+                    ),
+                    "chatbot": None,
+                }
+            return self.collections[collection]
+
+    def qdrant_adaptor(self, collection: str | None = None):
+        """
+        Get the Qdrant adaptor of a collection.
+
+        Args:
+            collection (str | None): The collection name. Defaults to COLLECTION_NAME.
+
+        Returns:
+            QdrantAdaptor: The collection's adaptor.
+        """
+        return self._services_for(collection)["qdrant_adaptor"]
+
+    def chatbot(self, collection: str | None = None):
+        """
+        Get the chatbot of a collection, constructing it on first use.
+
+        Args:
+            collection (str | None): The collection name. Defaults to COLLECTION_NAME.
+
+        Returns:
+            Chatbot: The collection's chatbot.
+        """
+        entry = self._services_for(collection)
+        with self._lock:
+            if entry["chatbot"] is None:
+                entry["chatbot"] = self._create_chatbot(entry["qdrant_adaptor"])
+            return entry["chatbot"]
+
+    async def start(self):
+        """
+        Run `warm_up` in a worker thread and record whether it succeeded.
+        """
+        try:
+            await asyncio.to_thread(self.warm_up)
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"Warm-up failed: {e}")
+        finally:
+            self._ready.set()
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """
+        Wait until warm-up has finished.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the services are ready.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.status == "ready"
+
+    def require_ready(self):
+        """
+        Raise a 503 error unless the services are ready.
+
+        Raises:
+            HTTPException: If warm-up has not finished or has failed.
+        """
+        if self.status != "ready":
+            raise HTTPException(
+                status_code=503, detail=f"Service is {self.status}, try again later."
+            )
+
+    def state(self) -> dict:
+        """
+        Describe the current warm-up state.
+
+        Returns:
+            dict: The status, error, per-step timings and the collections loaded so far.
+        """
+        return {
+            "status": self.status,
+            "error": self.error,
+            "timings": self.timings,
+            "collections": sorted(self.collections),
+        }
+
+
+def resolve_collection(collection: str | None) -> str:
+    """
+    Validate a requested collection against COLLECTIONS.
+
+    Args:
+        collection (str | None): The requested collection name, or None for the default.
+
+    Returns:
+        str: The collection name to use.
+
+    Raises:
+        HTTPException: If the collection is not in the allowed list.
+    """
+    collection = collection or collection_name
+    if collection not in allowed_collections:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown collection '{collection}'."
+        )
+    return collection
+
+
+def data_dir(collection: str) -> str:
+    """
+    The directory holding the uploaded PDFs of a collection.
+
+    The default collection keeps using ./data/ so existing source paths stay valid;
+    every other collection stores its files in ./data/<collection>/.
+
+    Args:
+        collection (str): The validated collection name.
+
+    Returns:
+        str: The directory path, ending with a slash.
+    """
+    if collection == collection_name:
+        return "./data/"
+    return f"./data/{collection}/"
+
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    """
+    Reject requests to the admin endpoints without the ADMIN_TOKEN in the X-Admin-Token header.
+
+    Args:
+        x_admin_token (str | None): The X-Admin-Token request header.
+
+    Raises:
+        HTTPException: 403 if ADMIN_TOKEN is not configured, 401 if the token does not match.
+    """
+    if not admin_token:
+        raise HTTPException(
+            status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN."
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+def resolve_snapshot_dir(export_dir: str) -> str:
+    """
+    Resolve a snapshot directory named in a request, which must lie under SNAPSHOT_ROOT.
+
+    Args:
+        export_dir (str): The snapshot directory, relative to SNAPSHOT_ROOT.
+
+    Returns:
+        str: The absolute snapshot directory path.
+
+    Raises:
+        HTTPException: If the path points outside SNAPSHOT_ROOT.
+    """
+    path = os.path.realpath(os.path.join(snapshot_root, export_dir))
+    if os.path.commonpath([path, snapshot_root]) != snapshot_root or path == snapshot_root:
+        raise HTTPException(
+            status_code=400, detail="export_dir must be a directory under SNAPSHOT_ROOT."
+        )
+    return path
+
+
+services = ServiceRegistry()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start warming up the services in the background once the server is running.
+    """
+    warm_up_task = asyncio.create_task(services.start())
+    yield
+    warm_up_task.cancel()
+
+
+# Create a FastAPI instance
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow cross-origin requests
 origins = [
@@ -85,21 +416,94 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+@app.get("/health/live")
+async def liveness():
+    """
+    API endpoint reporting that the process is up while it is warming up or ready.
+
+    Warm-up is not retried, so a worker whose warm-up failed reports 503 here to be
+    restarted by the liveness probe.
+
+    Returns:
+        JSONResponse: The liveness status, with status code 503 if warm-up failed.
+    """
+    if services.status == "failed":
+        return JSONResponse(
+            content={"status": "failed", "error": services.error}, status_code=503
+        )
+    return JSONResponse(content={"status": "alive"})
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    API endpoint reporting whether the services have finished warming up.
+
+    Returns:
+        JSONResponse: The warm-up state, with status code 200 when ready and 503 otherwise.
+    """
+    return JSONResponse(
+        content=services.state(),
+        status_code=200 if services.status == "ready" else 503,
+    )
+
+
+@app.get("/metrics/qdrant")
+async def qdrant_metrics():
+    """
+    API endpoint exposing the Qdrant access layer's latency histograms and counters.
+
+    Returns:
+        dict: Per-operation latency histograms plus hedge, retry, timeout and error counts.
+    """
+    qdrant_adaptor = await asyncio.to_thread(services.qdrant_adaptor)
+    return qdrant_adaptor.pool.metrics()
+
+
+@app.get("/metrics/collections")
+async def collection_metrics():
+    """
+    API endpoint exposing each loaded collection's chatbot latencies and speculation hit rate.
+
+    Returns:
+        dict: Per collection, the chatbot metrics, or None if no chat has used it yet.
+    """
+    services.require_ready()
+    return {
+        name: entry["chatbot"].metrics() if entry["chatbot"] else None
+        for name, entry in list(services.collections.items())
+    }
+
+
 @app.websocket("/api/chatbot")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, collection: str | None = None):
     """
     Handle WebSocket connections for the chatbot.
 
     Args:
         websocket (WebSocket): The WebSocket connection to handle.
+        collection (str | None): The knowledge base to chat with (query parameter).
+                                 Defaults to COLLECTION_NAME.
     """
     await manager.connect(websocket)
+    if not await services.wait_ready(warm_up_wait_seconds):
+        manager.disconnect(websocket)
+        await websocket.close(code=1013, reason=f"Service is {services.status}")
+        return
+    try:
+        chatbot = await asyncio.to_thread(services.chatbot, collection)
+    except HTTPException as e:
+        manager.disconnect(websocket)
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    # Each connection is its own conversation, even when chatting with the same collection
+    thread_id = str(uuid.uuid4())
     try:
         while True:
             user_message = await websocket.receive_text()
             print(f"Received message: {user_message}")
             async for response, source, filename in chatbot.stream_response(
-                user_message
+                user_message, thread_id
             ):
                 result = {"response": response, "source": source, "filename": filename}
                 await manager.send_personal_message(result, websocket)
@@ -109,15 +513,26 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"Error: {e}")
         manager.disconnect(websocket)
+    finally:
+        chatbot.end_thread(thread_id)
 
 
 @app.post("/files/create")
-async def create_file(file: UploadFile = File(...)):
+async def create_file(
+    file: UploadFile = File(...),
+    document_id: str | None = Form(None),
+    effective_date: str | None = Form(None),
+    collection: str | None = Form(None),
+):
     """
     API endpoint to upload a file and add its content to the Qdrant collection.
 
     Args:
         file (UploadFile): The file to be uploaded and processed.
+        document_id (str | None): Groups versions of the same document. Defaults to the file name.
+        effective_date (str | None): The version's effective date, "YYYY-MM-DD HH:MM:SS.ffffff".
+                                     Defaults to now.
+        collection (str | None): The target collection. Defaults to COLLECTION_NAME.
 
     Returns:
         dict: A success message indicating the file has been added to the collection.
@@ -125,15 +540,18 @@ async def create_file(file: UploadFile = File(...)):
     Raises:
         HTTPException: If there is an error while creating the file.
     """
+    qdrant_adaptor = await asyncio.to_thread(services.qdrant_adaptor, collection)
     try:
-        data_dir = "./data/"
-        os.makedirs(data_dir, exist_ok=True)
+        file_dir = data_dir(qdrant_adaptor.collection_name)
+        os.makedirs(file_dir, exist_ok=True)
 
-        file_path = os.path.join(data_dir, file.filename)
+        file_path = os.path.join(file_dir, file.filename)
         with open(file_path, "wb") as f:
             f.write(await file.read())
 
-        qdrant_adaptor.create_file(file_path)
+        await asyncio.to_thread(
+            qdrant_adaptor.create_file, file_path, effective_date, document_id
+        )
 
         return {"message": f"File '{file.filename}' added to collection."}
     except Exception as e:
@@ -141,18 +559,22 @@ async def create_file(file: UploadFile = File(...)):
 
 
 @app.get("/files/list")
-async def list_files():
+async def list_files(collection: str | None = None):
     """
     API endpoint to list all files in the Qdrant collection.
 
+    Args:
+        collection (str | None): The collection to list. Defaults to COLLECTION_NAME.
+
     Returns:
         dict: A list of filenames present in the collection.
 
     Raises:
         HTTPException: If there is an error while listing files.
     """
+    qdrant_adaptor = await asyncio.to_thread(services.qdrant_adaptor, collection)
     try:
-        filenames = qdrant_adaptor.list_file_path()
+        filenames = await asyncio.to_thread(qdrant_adaptor.list_file_path)
         filenames = [os.path.basename(filename) for filename in filenames]
         return {"filenames": filenames}
     except Exception as e:
@@ -160,12 +582,13 @@ async def list_files():
 
 
 @app.delete("/files/delete")
-async def delete_file(filename: str):
+async def delete_file(filename: str, collection: str | None = None):
     """
     API endpoint to delete a file from the Qdrant collection and local storage.
 
     Args:
         filename (str): The name of the file to be deleted.
+        collection (str | None): The collection holding the file. Defaults to COLLECTION_NAME.
 
     Returns:
         dict: A success message indicating the file has been deleted.
@@ -173,13 +596,13 @@ async def delete_file(filename: str):
     Raises:
         HTTPException: If there is an error while deleting the file.
     """
+    qdrant_adaptor = await asyncio.to_thread(services.qdrant_adaptor, collection)
     try:
-        file_path = f"./data/{filename}"
+        file_path = os.path.join(data_dir(qdrant_adaptor.collection_name), filename)
 
-        qdrant_adaptor.delete_file(file_path)
+        await asyncio.to_thread(qdrant_adaptor.delete_file, file_path)
 
-        filenames_after_deletion = qdrant_adaptor.list_file_path()
-        if file_path in filenames_after_deletion:
+        if await asyncio.to_thread(qdrant_adaptor.has_file, file_path):
             raise HTTPException(
                 status_code=500,
                 detail=f"File '{filename}' could not be deleted from the collection.",
@@ -193,3 +616,92 @@ async def delete_file(filename: str):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting file: {e}")
+
+
+@app.post("/admin/reindex", dependencies=[Depends(require_admin)])
+async def start_reindex(
+    export_dir: str | None = None,
+    max_points_per_second: float | None = None,
+    replace_collection: bool = False,
+    collection: str | None = None,
+):
+    """
+    API endpoint to rebuild the collection in the background and swap the alias when done.
+
+    Args:
+        export_dir (str | None): Rebuild from this snapshot directory (relative to SNAPSHOT_ROOT)
+                                 instead of the stored PDFs.
+        max_points_per_second (float | None): Upload throughput cap. Defaults to REINDEX_MAX_POINTS_PER_SECOND.
+        replace_collection (bool): Allow replacing a physical collection by an alias (one-time migration).
+        collection (str | None): The collection to rebuild. Defaults to COLLECTION_NAME.
+
+    Returns:
+        dict: A message with the rebuild status.
+
+    Raises:
+        HTTPException: If a rebuild is already running, or the alias cannot be swapped.
+    """
+    snapshot_dir = resolve_snapshot_dir(export_dir) if export_dir else None
+    qdrant_adaptor = await asyncio.to_thread(services.qdrant_adaptor, collection)
+    if qdrant_adaptor.rebuild_status.get("state") == "building":
+        raise HTTPException(status_code=409, detail="A rebuild is already running.")
+
+    qdrant_adaptor.rebuild_status = {"state": "building"}
+    try:
+        await asyncio.to_thread(qdrant_adaptor.check_alias_swap, replace_collection)
+    except ValueError as e:
+        qdrant_adaptor.rebuild_status = {"state": "failed", "error": str(e)}
+        raise HTTPException(status_code=409, detail=str(e))
+
+    threading.Thread(
+        target=qdrant_adaptor.rebuild_collection,
+        kwargs={
+            "export_dir": snapshot_dir,
+            "max_points_per_second": max_points_per_second
+            or reindex_max_points_per_second,
+            "replace_collection": replace_collection,
+        },
+        daemon=True,
+    ).start()
+    return {"message": "Rebuild started.", "status": await reindex_status(collection)}
+
+
+@app.get("/admin/reindex", dependencies=[Depends(require_admin)])
+async def reindex_status(collection: str | None = None):
+    """
+    API endpoint reporting the progress of the latest rebuild.
+
+    Args:
+        collection (str | None): The collection being rebuilt. Defaults to COLLECTION_NAME.
+
+    Returns:
+        dict: The rebuild state, target collection, files done/total, points and throughput.
+    """
+    qdrant_adaptor = await asyncio.to_thread(services.qdrant_adaptor, collection)
+    return {
+        key: value
+        for key, value in qdrant_adaptor.rebuild_status.items()
+        if not key.startswith("_")
+    }
+
+
+@app.post("/admin/reindex/rollback", dependencies=[Depends(require_admin)])
+async def rollback_reindex(collection: str | None = None):
+    """
+    API endpoint to point the collection alias back to the previous version.
+
+    Args:
+        collection (str | None): The collection to roll back. Defaults to COLLECTION_NAME.
+
+    Returns:
+        dict: A message naming the collection now in use.
+
+    Raises:
+        HTTPException: If there is no previous version to roll back to.
+    """
+    qdrant_adaptor = await asyncio.to_thread(services.qdrant_adaptor, collection)
+    try:
+        version = await asyncio.to_thread(qdrant_adaptor.rollback_alias)
+        return {"message": f"Alias now points to '{version}'."}
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,169 @@
+# Build a reduced, quantized thai2fit table for Thai2VecEmbedder and report its cost/accuracy.
+#
+# Usage (from the src directory):
+#   python -m scripts.build_wordvec_table ./data --output ./data/thai2fit_int8.npz --top-n 20000
+#   WORDVEC_TABLE=./data/thai2fit_int8.npz uvicorn app:app
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+
+from adaptors.qdrant_adaptors import load_pdf_chunks
+from scripts.bulk_index import find_pdfs
+from services.compact_word_vectors import CompactWordVectors, dict_nbytes
+from services.pdf_extraction_cache import PdfExtractionCache
+from services.text_cleaner import TextCleaner
+from services.thai_chunker import ThaiTokenChunker
+from services.thai_to_vec_embedder import Thai2VecEmbedder
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def load_corpus_chunks(directory: str) -> list[str]:
+    """
+    Loads the cleaned chunk texts of every PDF under a directory, as ingestion would.
+
+    Args:
+        directory (str): The directory to walk for PDFs.
+
+    Returns:
+        list[str]: The chunk texts.
+    """
+    text_cleaner = TextCleaner()
+    extraction_cache = PdfExtractionCache.from_env()
+    chunker = ThaiTokenChunker.from_env()
+    chunks = []
+    for pdf_path in find_pdfs(directory):
+        chunks.extend(
+            chunk.page_content
+            for chunk in load_pdf_chunks(
+                pdf_path, "", text_cleaner, None, extraction_cache, chunker=chunker
+            )
+        )
+    return chunks
+
+
+def corpus_vocabulary(chunks: list[str], model) -> set[str]:
+    """
+    Collects the tokens of the corpus that exist in the full model.
+
+    Args:
+        chunks (list[str]): The chunk texts.
+        model: The full gensim KeyedVectors model.
+
+    Returns:
+        set[str]: The in-vocabulary corpus tokens.
+    """
+    from pythainlp.tokenize import word_tokenize
+
+    vocabulary = set()
+    for chunk in chunks:
+        vocabulary.update(token for token in word_tokenize(chunk) if token in model)
+    return vocabulary
+
+
+def cosine_drift(full: list, reduced: list) -> dict:
+    """
+    Compares chunk embeddings from the full and the reduced table.
+
+    Args:
+        full (list): Embeddings from the full model (None for chunks without known tokens).
+        reduced (list): Embeddings from the reduced table.
+
+    Returns:
+        dict: Mean, 5th percentile and minimum cosine similarity, plus coverage mismatches.
+    """
+    similarities = []
+    mismatched = 0
+    for a, b in zip(full, reduced):
+        if a is None or b is None:
+            mismatched += (a is None) != (b is None)
+            continue
+        similarities.append(
+            float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) or 1))
+        )
+    similarities = np.asarray(similarities)
+    if not similarities.size:
+        return {"mean": None, "p5": None, "min": None, "mismatched": mismatched}
+    return {
+        "mean": float(similarities.mean()),
+        "p5": float(np.percentile(similarities, 5)),
+        "min": float(similarities.min()),
+        "mismatched": mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a reduced thai2fit word vector table.")
+    parser.add_argument("corpus", help="Directory of PDFs whose vocabulary must be kept.")
+    parser.add_argument("--output", required=True, help="The .npz table to write.")
+    parser.add_argument(
+        "--top-n",
+        type=int,
+        default=20000,
+        help="Also keep the first N words of the model vocabulary (most frequent first).",
+    )
+    parser.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--buckets", type=int, default=2048)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    full_embedder = Thai2VecEmbedder()
+    full_embedder.table_path = None  # Force the gensim model even if WORDVEC_TABLE is set
+    model = full_embedder.load()
+    full_load_seconds = time.perf_counter() - start
+
+    chunks = load_corpus_chunks(args.corpus)
+    keep_words = corpus_vocabulary(chunks, model) | set(model.index_to_key[: args.top_n])
+    logging.info(
+        f"Keeping {len(keep_words)} of {len(model.index_to_key)} words "
+        f"({len(chunks)} corpus chunks)."
+    )
+    CompactWordVectors.build(
+        model, keep_words, args.output, dtype=args.dtype, num_buckets=args.buckets
+    )
+
+    start = time.perf_counter()
+    reduced_embedder = Thai2VecEmbedder(table_path=args.output)
+    table = reduced_embedder.load()
+    reduced_load_seconds = time.perf_counter() - start
+
+    drift = cosine_drift(
+        full_embedder.embed_documents(chunks), reduced_embedder.embed_documents(chunks)
+    )
+
+    # Both figures include the word lookup, not only the vectors: the gensim model's
+    # key_to_index dict and index_to_key list, and the reduced table's blob and dict.
+    full_bytes = (
+        model.vectors.nbytes
+        + dict_nbytes(model.key_to_index)
+        + sys.getsizeof(model.index_to_key)
+    )
+    print(f"| {'Table':<20} | {'Words':>8} | {'Memory':>14} | {'Load time':>10} |")
+    print(f"| {'-' * 20} | {'-' * 8} | {'-' * 14} | {'-' * 10} |")
+    print(
+        f"| {'thai2fit (gensim)':<20} | {len(model.index_to_key):>8} | "
+        f"{full_bytes / 2**20:>11.1f} MB | {full_load_seconds:>9.2f}s |"
+    )
+    print(
+        f"| {'reduced ' + args.dtype:<20} | {len(table):>8} | "
+        f"{table.nbytes / 2**20:>11.1f} MB | {reduced_load_seconds:>9.2f}s |"
+    )
+    print()
+    print(f"Memory saved: {(1 - table.nbytes / full_bytes) * 100:.1f}%")
+    if drift["mean"] is None:
+        print("Cosine drift: no chunk embeddings to compare.")
+    else:
+        print(
+            f"Chunk embedding cosine vs full model: mean {drift['mean']:.5f}, "
+            f"p5 {drift['p5']:.5f}, min {drift['min']:.5f}, "
+            f"{drift['mismatched']} chunks with different coverage."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+# Offline bulk indexer: walks a directory of PDFs and loads them into Qdrant.
+#
+# Usage (from the src directory):
+#   python -m scripts.bulk_index ./data/guidelines --collection medical --workers 8
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from queue import Queue
+
+from adaptors.qdrant_adaptors import QdrantAdaptor, embed_chunks, load_pdf_chunks
+from services.pdf_extraction_cache import PdfExtractionCache
+from services.text_cleaner import TextCleaner
+from services.thai_chunker import ThaiTokenChunker
+from services.thai_to_vec_embedder import Thai2VecEmbedder
+from utilities.file_utils import file_sha256
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Per-process services, created once by `_init_worker`.
+_worker = {}
+
+
+def _init_worker():
+    """
+    Loads the text cleaner, extraction cache, chunker and thai2fit model once per worker process.
+    """
+    _worker["text_cleaner"] = TextCleaner()
+    _worker["extraction_cache"] = PdfExtractionCache.from_env()
+    _worker["chunker"] = ThaiTokenChunker.from_env()
+    _worker["thai2vec"] = Thai2VecEmbedder()
+
+
+def _parse_and_embed(
+    pdf_path: str,
+    file_hash: str,
+    effective_date: str,
+    vector_size: int,
+    document_id: str | None = None,
+):
+    """
+    Parses, cleans and embeds one PDF inside a worker process.
+
+    Args:
+        pdf_path (str): The file path of the PDF to process.
+        file_hash (str): SHA-256 of the PDF content.
+        effective_date (str): The effective date stored in the chunk metadata.
+        vector_size (int): The size of the vector embeddings.
+        document_id (str | None, optional): Identifies all versions of the same document.
+
+    Returns:
+        tuple: The pdf path, its hash and the (ids, vectors, payloads) to upload.
+    """
+    chunks = load_pdf_chunks(
+        pdf_path,
+        effective_date,
+        _worker["text_cleaner"],
+        file_hash,
+        _worker["extraction_cache"],
+        document_id=document_id,
+        chunker=_worker["chunker"],
+    )
+    ids, vectors, payloads = embed_chunks(chunks, _worker["thai2vec"], vector_size)
+    return pdf_path, file_hash, ids, vectors, payloads
+
+
+def find_pdfs(directory: str) -> list[str]:
+    """
+    Recursively lists the PDF files under a directory.
+
+    Args:
+        directory (str): The root directory to walk.
+
+    Returns:
+        list[str]: Sorted PDF file paths.
+    """
+    pdf_paths = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.lower().endswith(".pdf"):
+                pdf_paths.append(os.path.join(root, filename))
+    return sorted(pdf_paths)
+
+
+def document_id_for(pdf_path: str, directory: str, document_id_from: str = "path") -> str:
+    """
+    Derives the document id of a PDF found under the indexed directory.
+
+    Args:
+        pdf_path (str): The file path of the PDF.
+        directory (str): The indexed root directory.
+        document_id_from (str, optional): "path" for the path relative to `directory`, so
+            `2023/guideline.pdf` and `2024/guideline.pdf` stay separate documents, or
+            "name" for the bare file name, so they become versions of one document.
+            Defaults to "path".
+
+    Returns:
+        str: The document id.
+    """
+    if document_id_from == "name":
+        return os.path.basename(pdf_path)
+    return os.path.relpath(pdf_path, directory).replace(os.sep, "/")
+
+
+def load_checkpoint(checkpoint_path: str) -> dict:
+    """
+    Loads the completed files from an append-only checkpoint log.
+
+    Args:
+        checkpoint_path (str): The checkpoint file path (JSON lines).
+
+    Returns:
+        dict: A mapping of file hash to {"path", "chunks"} for completed files.
+    """
+    completed = {}
+    if not os.path.exists(checkpoint_path):
+        return completed
+    with open(checkpoint_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line torn by an interrupted run
+            completed[entry["hash"]] = {"path": entry["path"], "chunks": entry["chunks"]}
+    return completed
+
+
+def append_checkpoint(checkpoint_path: str, file_hash: str, pdf_path: str, chunks: int):
+    """
+    Appends one completed file to the checkpoint log.
+
+    Args:
+        checkpoint_path (str): The checkpoint file path (JSON lines).
+        file_hash (str): SHA-256 of the PDF content.
+        pdf_path (str): The file path of the PDF.
+        chunks (int): The number of chunks uploaded for it.
+    """
+    with open(checkpoint_path, "a", encoding="utf-8") as f:
+        f.write(
+            json.dumps(
+                {"hash": file_hash, "path": pdf_path, "chunks": chunks},
+                ensure_ascii=False,
+            )
+            + "\n"
+        )
+
+
+def bulk_index(
+    adaptor: QdrantAdaptor,
+    directory: str,
+    checkpoint_path: str,
+    workers: int,
+    upload_batch_size: int,
+    upload_parallel: int,
+    effective_date: str,
+    document_id_from: str = "path",
+) -> dict:
+    """
+    Indexes every new PDF under a directory into the adaptor's collection.
+
+    Files whose hash is in the checkpoint are skipped. A file that has points in the
+    collection but no checkpoint entry was interrupted or failed mid-upload (its points
+    were never promoted to current), so its points are deleted and it is indexed again.
+    Parsing and embedding run in a process pool. Parsed files are handed to a few
+    long-lived upload threads, so uploads never block collecting parse results and
+    no worker process pool is started per file. Each uploaded file is appended to
+    the checkpoint log so an interrupted run resumes where it stopped.
+
+    Args:
+        adaptor (QdrantAdaptor): The adaptor for the target collection.
+        directory (str): The directory to walk for PDFs.
+        checkpoint_path (str): The checkpoint file path.
+        workers (int): Number of parse/embed worker processes.
+        upload_batch_size (int): Points per upsert request.
+        upload_parallel (int): Upload threads, each sending one file's points at a time.
+        effective_date (str): The effective date stored in the chunk metadata.
+        document_id_from (str, optional): How document ids are derived, see `document_id_for`.
+                                          Defaults to "path".
+
+    Returns:
+        dict: Run statistics (docs, chunks, skipped, failed, seconds).
+    """
+    completed = load_checkpoint(checkpoint_path)
+
+    pending = {}
+    skipped = 0
+    for pdf_path in find_pdfs(directory):
+        file_hash = file_sha256(pdf_path)
+        if file_hash in completed or file_hash in pending:
+            skipped += 1
+            continue
+        pending[file_hash] = pdf_path
+
+    stale = adaptor.list_file_hashes() & pending.keys()
+    for file_hash in stale:
+        adaptor.delete_file_hash(file_hash)
+
+    logging.info(
+        f"{len(pending)} PDFs to index ({len(stale)} left unfinished by an earlier run), "
+        f"{skipped} skipped (already indexed or duplicate)."
+    )
+
+    stats = {"docs": 0, "chunks": 0, "skipped": skipped, "failed": 0}
+    stats_lock = threading.Lock()
+    uploads = Queue(maxsize=workers * 2)
+
+    def upload_worker():
+        while True:
+            item = uploads.get()
+            if item is None:
+                return
+            pdf_path, file_hash, ids, vectors, payloads = item
+            try:
+                if ids:
+                    adaptor.upload_points(
+                        ids, vectors, payloads, batch_size=upload_batch_size
+                    )
+                    adaptor.refresh_current_version(payloads[0]["metadata"]["document_id"])
+            except Exception as e:
+                with stats_lock:
+                    stats["failed"] += 1
+                logging.error(f"Error uploading '{pdf_path}': {e}")
+                # Remove the points that did arrive, so they are not left behind hidden.
+                try:
+                    adaptor.delete_file_hash(file_hash)
+                except Exception as e:
+                    logging.error(
+                        f"Error deleting the partial upload of '{pdf_path}': {e}. "
+                        "It is cleaned up on the next run."
+                    )
+                continue
+
+            with stats_lock:
+                append_checkpoint(checkpoint_path, file_hash, pdf_path, len(ids))
+                stats["docs"] += 1
+                stats["chunks"] += len(ids)
+                logging.info(
+                    f"Indexed '{pdf_path}' ({len(ids)} chunks) "
+                    f"[{stats['docs']}/{len(pending)}]"
+                )
+
+    uploaders = [
+        threading.Thread(target=upload_worker, daemon=True)
+        for _ in range(max(upload_parallel, 1))
+    ]
+    for uploader in uploaders:
+        uploader.start()
+
+    start = time.perf_counter()
+    to_parse = list(pending.items())
+    in_flight = {}
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            while to_parse or in_flight:
+                # Keep a bounded window of parsed files in memory.
+                while to_parse and len(in_flight) < workers * 2:
+                    file_hash, pdf_path = to_parse.pop(0)
+                    future = pool.submit(
+                        _parse_and_embed,
+                        pdf_path,
+                        file_hash,
+                        effective_date,
+                        adaptor.vector_size,
+                        document_id_for(pdf_path, directory, document_id_from),
+                    )
+                    in_flight[future] = pdf_path
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_path = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        with stats_lock:
+                            stats["failed"] += 1
+                        logging.error(f"Error parsing '{pdf_path}': {e}")
+                        continue
+                    # Blocks while the upload threads are behind, bounding memory.
+                    uploads.put(result)
+    finally:
+        for _ in uploaders:
+            uploads.put(None)
+        for uploader in uploaders:
+            uploader.join()
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk index a directory of PDFs into Qdrant.")
+    parser.add_argument("directory", help="Directory to walk for PDF files.")
+    parser.add_argument(
+        "--collection",
+        default=os.getenv("COLLECTION_NAME"),
+        help="Target collection (defaults to $COLLECTION_NAME).",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Checkpoint log (defaults to <directory>/.bulk_index_checkpoint.jsonl).",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument(
+        "--parallel", type=int, default=4, help="Number of upload threads."
+    )
+    parser.add_argument(
+        "--effective-date",
+        default=None,
+        help='Effective date for all files, format "YYYY-MM-DD HH:MM:SS.ffffff".',
+    )
+    parser.add_argument(
+        "--document-id-from",
+        choices=["path", "name"],
+        default="path",
+        help=(
+            "Derive document ids from the path relative to the directory (default), "
+            "or from the bare file name to treat same-named files as versions of one document."
+        ),
+    )
+    args = parser.parse_args()
+
+    if not args.collection:
+        parser.error("--collection is required when COLLECTION_NAME is not set.")
+
+    effective_date = args.effective_date or datetime.now().strftime(
+        "%Y-%m-%d %H:%M:%S.%f"
+    )
+    checkpoint_path = args.checkpoint or os.path.join(
+        args.directory, ".bulk_index_checkpoint.jsonl"
+    )
+
+    adaptor = QdrantAdaptor(args.collection)
+    stats = bulk_index(
+        adaptor,
+        args.directory,
+        checkpoint_path,
+        args.workers,
+        args.batch_size,
+        args.parallel,
+        effective_date,
+        args.document_id_from,
+    )
+
+    seconds = max(stats["seconds"], 1e-9)
+    print(
+        f"Indexed {stats['docs']} docs / {stats['chunks']} chunks in {seconds:.1f}s "
+        f"({stats['docs'] / seconds * 60:.1f} docs/min, "
+        f"{stats['chunks'] / seconds:.1f} chunks/sec); "
+        f"skipped {stats['skipped']}, failed {stats['failed']}."
+    )
+
+
+if __name__ == "__main__":
+    main()
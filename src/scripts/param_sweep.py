@@ -0,0 +1,418 @@
+# Offline sweep of chunking, cleaning, top-k and word-vector settings against a labeled question set.
+#
+# Every setting is ingested into its own Qdrant collection with QdrantAdaptor and evaluated
+# with recall@k, MRR, index size, ingest time and query latency. Collections are local unless
+# --qdrant-url is given; quantized settings need a server, since local mode ignores quantization.
+#
+# Usage (from the src directory):
+#   python -m scripts.param_sweep ./data/guidelines --questions ./data/eval_questions.jsonl \
+#       --chunk-tokens 200 400 800 --overlap-tokens 0 40 --top-k 5 10 20 --output sweep.csv
+#   python -m scripts.param_sweep ./data/guidelines --questions ./data/eval_questions.jsonl \
+#       --qdrant-url http://localhost:6333 --quantization int8 --oversampling 2.0
+#
+# The questions file has one JSON object per line:
+#   {"question": "...", "source": "guideline.pdf", "page": 12}
+# `page` is 1-based, as shown in the chatbot's citations; use "pages": [12, 13] when
+# several pages answer the question.
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from adaptors.qdrant_adaptors import QdrantAdaptor, load_pdf_chunks
+from adaptors.qdrant_pool import QdrantPool
+from scripts.bulk_index import find_pdfs
+from services.chatbot import current_version_filter, quantized_search_params
+from services.pdf_extraction_cache import PdfExtractionCache
+from services.text_cleaner import TextCleaner
+from services.thai_chunker import ThaiTokenChunker
+from services.thai_to_vec_embedder import Thai2VecEmbedder
+from utilities.file_utils import file_sha256
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+COLUMNS = [
+    "table",
+    "chunk_tokens",
+    "overlap_tokens",
+    "cleaning",
+    "top_k",
+    "recall",
+    "mrr",
+    "points",
+    "index_mb",
+    "ingest_seconds",
+    "p50_ms",
+    "p95_ms",
+]
+
+
+class PassThroughCleaner:
+    """
+    Stands in for TextCleaner when a setting runs without text cleaning.
+    """
+
+    def preprocess_text(self, text: str) -> str:
+        return text
+
+
+def load_questions(path: str) -> list[dict]:
+    """
+    Loads the labeled questions.
+
+    Args:
+        path (str): The JSONL file path.
+
+    Returns:
+        list[dict]: The questions, each with "question", "source" (file name) and "pages" (1-based).
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            questions.append(
+                {
+                    "question": entry["question"],
+                    "source": os.path.basename(entry["source"]),
+                    "pages": set(entry.get("pages") or [entry["page"]]),
+                }
+            )
+    return questions
+
+
+def load_embedder(table: str) -> Thai2VecEmbedder:
+    """
+    Loads the embedder for a word-vector table.
+
+    Args:
+        table (str): "full" for the gensim thai2fit model, or the path of a reduced table.
+
+    Returns:
+        Thai2VecEmbedder: The loaded embedder.
+    """
+    embedder = Thai2VecEmbedder(table_path=None if table == "full" else table)
+    if table == "full":
+        embedder.table_path = None  # Force the gensim model even if WORDVEC_TABLE is set
+    embedder.load()
+    return embedder
+
+
+def ingest(adaptor: QdrantAdaptor, pdf_paths: list[str], file_hashes: dict) -> dict:
+    """
+    Ingests the corpus with the adaptor's chunker and text cleaner.
+
+    Each collection holds a single version of every document, so the chunks are stored as
+    current directly instead of being promoted with `refresh_current_version`.
+
+    Args:
+        adaptor (QdrantAdaptor): The adaptor of the setting's collection.
+        pdf_paths (list[str]): The PDFs to ingest.
+        file_hashes (dict): SHA-256 per PDF path, used as extraction cache keys.
+
+    Returns:
+        dict: The number of points, the approximate index size in bytes and the ingest time.
+    """
+    start = time.perf_counter()
+    points = 0
+    index_bytes = 0
+    for pdf_path in pdf_paths:
+        chunks = load_pdf_chunks(
+            pdf_path,
+            "",
+            adaptor.text_cleaner,
+            file_hashes[pdf_path],
+            adaptor.extraction_cache,
+            chunker=adaptor.chunker,
+        )
+        for chunk in chunks:
+            chunk.metadata["is_current"] = True
+        ids, vectors, payloads = adaptor.process_documents(chunks)
+        adaptor.upload_points(ids, vectors, payloads)
+        points += len(ids)
+        index_bytes += vectors.nbytes + sum(
+            len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+            for payload in payloads
+        )
+    return {
+        "points": points,
+        "index_bytes": index_bytes,
+        "ingest_seconds": time.perf_counter() - start,
+    }
+
+
+def evaluate(
+    adaptor: QdrantAdaptor,
+    questions: list[dict],
+    top_k: int,
+    oversampling: float | None = None,
+) -> dict:
+    """
+    Runs every question as the chatbot would (embed, then one query) and scores the hits.
+
+    The query uses the chatbot's current-version filter and quantization search parameters.
+    A hit is relevant when its file name and 1-based page match the label.
+
+    Args:
+        adaptor (QdrantAdaptor): The adaptor of the setting's collection.
+        questions (list[dict]): The labeled questions from `load_questions`.
+        top_k (int): The number of hits retrieved per question.
+        oversampling (float | None, optional): Oversampling factor for quantized collections.
+
+    Returns:
+        dict: recall@k, MRR@k and the p50/p95 query latency in milliseconds.
+    """
+    query_filter = current_version_filter()
+    search_params = quantized_search_params(oversampling)
+    reciprocal_ranks = []
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        query_vector = adaptor.thai2vec.embed_documents([question["question"]])[0]
+        points = []
+        if query_vector is not None:
+            points = adaptor.pool.read(
+                "query",
+                lambda c: c.query_points(
+                    collection_name=adaptor.collection_name,
+                    query=query_vector.tolist(),
+                    query_filter=query_filter,
+                    limit=top_k,
+                    search_params=search_params,
+                    with_payload=True,
+                ),
+            ).points
+        latencies.append(time.perf_counter() - start)
+
+        reciprocal_rank = 0.0
+        for rank, point in enumerate(points, start=1):
+            metadata = point.payload["metadata"]
+            if (
+                os.path.basename(metadata["source"]) == question["source"]
+                and metadata["page"] + 1 in question["pages"]
+            ):
+                reciprocal_rank = 1 / rank
+                break
+        reciprocal_ranks.append(reciprocal_rank)
+
+    reciprocal_ranks = np.asarray(reciprocal_ranks)
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "recall": float((reciprocal_ranks > 0).mean()),
+        "mrr": float(reciprocal_ranks.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+def sweep(
+    corpus: str,
+    questions: list[dict],
+    tables: list[str],
+    chunk_tokens: list[int],
+    overlap_tokens: list[int],
+    cleaning: list[str],
+    top_ks: list[int],
+    qdrant_path: str = ":memory:",
+    quantization: str | None = None,
+    oversampling: float | None = None,
+    qdrant_url: str | None = None,
+) -> list[dict]:
+    """
+    Ingests and evaluates every combination of the given settings.
+
+    Each chunking/cleaning setting is ingested once into its own collection and evaluated
+    for every top-k. Collections are deleted after evaluation.
+
+    Local-mode Qdrant accepts a quantization config but always searches the original
+    vectors, so quantization is only allowed against a server.
+
+    Args:
+        corpus (str): The directory of PDFs.
+        questions (list[dict]): The labeled questions.
+        tables (list[str]): Word-vector tables ("full" or reduced table paths).
+        chunk_tokens (list[int]): Chunk sizes in tokens.
+        overlap_tokens (list[int]): Chunk overlaps in tokens.
+        cleaning (list[str]): "on" and/or "off".
+        top_ks (list[int]): Numbers of hits retrieved per question.
+        qdrant_path (str, optional): Local Qdrant storage path, or ":memory:". Ignored when
+                                     `qdrant_url` is given. Defaults to ":memory:".
+        quantization (str | None, optional): Quantization of the collections. Requires `qdrant_url`.
+        oversampling (float | None, optional): Oversampling factor for quantized collections.
+        qdrant_url (str | None, optional): A Qdrant server URL. The API key is read from QDRANT_API_KEY.
+
+    Returns:
+        list[dict]: One row per setting and top-k, with the keys in COLUMNS.
+    """
+    if quantization and not qdrant_url:
+        raise ValueError(
+            "Quantization has no effect in local mode; pass a Qdrant server URL."
+        )
+    pdf_paths = find_pdfs(corpus)
+    if not pdf_paths:
+        raise ValueError(f"No PDF files found under '{corpus}'.")
+
+    if qdrant_url:
+        pool = QdrantPool(
+            url=qdrant_url,
+            api_key=os.getenv("QDRANT_API_KEY"),
+            size=1,
+            timeouts={"query": 30.0},
+        )
+    else:
+        pool = QdrantPool(
+            clients=[QdrantClient(path=qdrant_path)],
+            timeouts={"query": 30.0},
+        )
+    # Unique collection names, so a sweep never reuses or deletes a server's own collections
+    run_id = time.strftime("%Y%m%d%H%M%S")
+
+    # Parse every PDF once up front, so ingest times measure chunking, cleaning,
+    # embedding and upload rather than the first setting paying for PDF parsing.
+    file_hashes = {pdf_path: file_sha256(pdf_path) for pdf_path in pdf_paths}
+    extraction_cache = PdfExtractionCache.from_env()
+    if extraction_cache:
+        for pdf_path in pdf_paths:
+            extraction_cache.load(pdf_path, file_hashes[pdf_path])
+
+    rows = []
+    settings = [
+        (c, o, clean)
+        for c, o, clean in itertools.product(chunk_tokens, overlap_tokens, cleaning)
+        if o < c
+    ]
+    for table in tables:
+        embedder = load_embedder(table)
+        for i, (chunk_size, overlap, clean) in enumerate(settings):
+            adaptor = QdrantAdaptor(
+                f"sweep_{run_id}_{i}", quantization=quantization, thai2vec=embedder, pool=pool
+            )
+            adaptor.chunker = ThaiTokenChunker(chunk_tokens=chunk_size, overlap_tokens=overlap)
+            adaptor.text_cleaner = TextCleaner() if clean == "on" else PassThroughCleaner()
+
+            logging.info(
+                f"Ingesting table={table} chunk_tokens={chunk_size} "
+                f"overlap_tokens={overlap} cleaning={clean}."
+            )
+            stats = ingest(adaptor, pdf_paths, file_hashes)
+            for top_k in top_ks:
+                rows.append(
+                    {
+                        "table": os.path.basename(table),
+                        "chunk_tokens": chunk_size,
+                        "overlap_tokens": overlap,
+                        "cleaning": clean,
+                        "top_k": top_k,
+                        "points": stats["points"],
+                        "index_mb": stats["index_bytes"] / 2**20,
+                        "ingest_seconds": stats["ingest_seconds"],
+                        **evaluate(adaptor, questions, top_k, oversampling),
+                    }
+                )
+            pool.write(
+                "delete_collection",
+                lambda c: c.delete_collection(collection_name=adaptor.collection_name),
+            )
+    return rows
+
+
+def print_table(rows: list[dict]):
+    """
+    Prints the results as a markdown table, best recall first.
+    """
+    headers = [
+        "Table", "Chunk", "Overlap", "Clean", "k", "Recall@k", "MRR",
+        "Points", "Index MB", "Ingest s", "p50 ms", "p95 ms",
+    ]
+    print("| " + " | ".join(headers) + " |")
+    print("|" + "|".join("-" * (len(h) + 2) for h in headers) + "|")
+    for row in sorted(rows, key=lambda r: (-r["recall"], -r["mrr"], r["p95_ms"])):
+        print(
+            f"| {row['table']} | {row['chunk_tokens']} | {row['overlap_tokens']} | "
+            f"{row['cleaning']} | {row['top_k']} | {row['recall']:.3f} | {row['mrr']:.3f} | "
+            f"{row['points']} | {row['index_mb']:.1f} | {row['ingest_seconds']:.1f} | "
+            f"{row['p50_ms']:.1f} | {row['p95_ms']:.1f} |"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep chunking, cleaning and retrieval settings against labeled questions."
+    )
+    parser.add_argument("corpus", help="Directory of PDFs to ingest.")
+    parser.add_argument("--questions", required=True, help="Labeled questions (JSONL).")
+    parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[200, 400, 800])
+    parser.add_argument("--overlap-tokens", type=int, nargs="+", default=[0, 40])
+    parser.add_argument(
+        "--cleaning", nargs="+", choices=["on", "off"], default=["on", "off"]
+    )
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument(
+        "--wordvec-tables",
+        nargs="+",
+        default=["full"],
+        help='Word-vector tables to compare: "full" (gensim thai2fit) or reduced .npz paths.',
+    )
+    parser.add_argument(
+        "--quantization", choices=QdrantAdaptor.QUANTIZATION_TYPES, default=None
+    )
+    parser.add_argument(
+        "--oversampling",
+        type=float,
+        default=None,
+        help="Rescore quantized searches with this oversampling factor.",
+    )
+    parser.add_argument(
+        "--qdrant-path",
+        default=":memory:",
+        help='Local Qdrant storage directory (defaults to ":memory:").',
+    )
+    parser.add_argument(
+        "--qdrant-url",
+        default=None,
+        help="Run against a Qdrant server instead (API key from QDRANT_API_KEY). "
+        "Required for --quantization.",
+    )
+    parser.add_argument("--output", default=None, help="Also write the results as CSV.")
+    args = parser.parse_args()
+    if args.quantization and not args.qdrant_url:
+        parser.error(
+            "--quantization has no effect in local mode (it always searches the original "
+            "vectors); use --qdrant-url."
+        )
+
+    questions = load_questions(args.questions)
+    rows = sweep(
+        args.corpus,
+        questions,
+        args.wordvec_tables,
+        args.chunk_tokens,
+        args.overlap_tokens,
+        args.cleaning,
+        args.top_k,
+        args.qdrant_path,
+        args.quantization,
+        args.oversampling,
+        args.qdrant_url,
+    )
+
+    print(f"{len(questions)} questions, {len(rows)} settings.")
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
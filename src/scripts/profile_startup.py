@@ -0,0 +1,113 @@
+# Cold-start profile: import time of a module plus the service warm-up steps.
+#
+# Usage (from the src directory):
+#   python -m scripts.profile_startup               # import app, top 25 modules
+#   python -m scripts.profile_startup --warm-up     # also time ServiceRegistry.warm_up
+#
+# Each measurement runs in a fresh interpreter so nothing is cached between runs.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+WARM_UP_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - start
+app.services.warm_up()
+print(json.dumps({"import_app": round(import_seconds, 3), **app.services.timings}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """
+    Parses the output of `python -X importtime`.
+
+    Args:
+        stderr (str): The interpreter's stderr.
+
+    Returns:
+        list[tuple[str, int, int]]: (module, self microseconds, cumulative microseconds) per import.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def profile_import(module: str, top: int):
+    """
+    Prints the total import time of a module and its slowest top-level dependencies.
+
+    Args:
+        module (str): The module to import.
+        top (int): Number of dependencies to print.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.getcwd(),
+    )
+    rows = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else "import failed")
+        return
+
+    total_us = next(cumulative for name, _, cumulative in rows if name.strip() == module)
+    print(f"import {module}: {total_us / 1e6:.3f}s cumulative, {len(rows)} modules")
+    print(f"{'cumulative [s]':>15} {'self [s]':>10}  module")
+
+    # Top-level packages only, so nested imports are not double counted.
+    top_level = {}
+    for name, self_us, cumulative_us in rows:
+        package = name.strip().split(".")[0]
+        if name.strip() == package:
+            top_level[package] = max(top_level.get(package, (0, 0)), (cumulative_us, self_us))
+    for package, (cumulative_us, self_us) in sorted(
+        top_level.items(), key=lambda item: item[1][0], reverse=True
+    )[:top]:
+        print(f"{cumulative_us / 1e6:>15.3f} {self_us / 1e6:>10.3f}  {package}")
+
+
+def profile_warm_up():
+    """
+    Prints the duration of `import app` and of every ServiceRegistry warm-up step.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", WARM_UP_SNIPPET],
+        capture_output=True,
+        text=True,
+        cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else "warm-up failed")
+        return
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    print("warm-up steps:")
+    for step, seconds in timings.items():
+        print(f"{seconds:>15.3f}  {step}")
+    print(f"{sum(timings.values()):>15.3f}  total until ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile application cold start.")
+    parser.add_argument("--module", default="app", help="Module to profile (default: app).")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument(
+        "--warm-up", action="store_true", help="Also time the service warm-up steps."
+    )
+    args = parser.parse_args()
+
+    profile_import(args.module, args.top)
+    if args.warm_up:
+        profile_warm_up()
+
+
+if __name__ == "__main__":
+    main()
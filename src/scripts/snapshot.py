@@ -0,0 +1,47 @@
+# Export or import a fully embedded collection as a columnar snapshot.
+#
+# Usage (from the src directory):
+#   python -m scripts.snapshot export ./snapshots/medical --collection medical
+#   python -m scripts.snapshot import ./snapshots/medical --collection medical --parallel 4
+import argparse
+import logging
+import os
+import time
+
+from adaptors.qdrant_adaptors import QdrantAdaptor
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a Qdrant collection snapshot.")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot directory.")
+    parser.add_argument(
+        "--collection",
+        default=os.getenv("COLLECTION_NAME"),
+        help="Collection to export from or import into (defaults to $COLLECTION_NAME).",
+    )
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    if not args.collection:
+        parser.error("--collection is required when COLLECTION_NAME is not set.")
+
+    adaptor = QdrantAdaptor(args.collection)
+    start = time.perf_counter()
+    if args.action == "export":
+        count = adaptor.export_collection(args.path, batch_size=args.batch_size)
+    else:
+        count = adaptor.import_collection(
+            args.path, batch_size=args.batch_size, parallel=args.parallel
+        )
+    seconds = max(time.perf_counter() - start, 1e-9)
+    print(f"{args.action.capitalize()}ed {count} points in {seconds:.1f}s ({count / seconds:.0f} points/sec).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,65 @@
 from typing import List
 from langchain_openai import OpenAI
 from langgraph.graph import MessagesState, StateGraph, END
-from langgraph.prebuilt import ToolNode, tools_condition
-from langchain_core.messages import SystemMessage
+from langgraph.prebuilt import tools_condition
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, ToolMessage
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.caches import InMemoryCache
-from langchain_core.globals import set_llm_cache
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 import os
-from adaptors.qdrant_adaptors import Thai2VecEmbedder
+from adaptors.qdrant_pool import LatencyHistogram
+from services.thai_to_vec_embedder import Thai2VecEmbedder
 import asyncio
+import difflib
+import time
+import tiktoken
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    QuantizationSearchParams,
+    QueryRequest,
+    SearchParams,
+)
+
+
+def current_version_filter() -> Filter:
+    """
+    The retrieval filter that skips superseded document versions.
+
+    Superseded versions are flagged is_current=False; points without the flag are kept.
+
+    Returns:
+        Filter: The Qdrant filter.
+    """
+    return Filter(
+        must_not=[
+            FieldCondition(key="metadata.is_current", match=MatchValue(value=False))
+        ]
+    )
+
+
+def quantized_search_params(oversampling: float | None) -> SearchParams | None:
+    """
+    The search parameters for a quantized collection.
+
+    Args:
+        oversampling (float | None): Oversampling factor, or None to search without rescoring.
+
+    Returns:
+        SearchParams | None: Rescoring with the given oversampling, or None.
+    """
+    if not oversampling:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(rescore=True, oversampling=oversampling)
+    )
 
 
 class State(MessagesState):
@@ -22,8 +68,10 @@ class State(MessagesState):
 
     Attributes:
         context (List[Document]): A list of documents representing the context of the chatbot's current state.
+        summary (str): A running summary of the turns removed from "messages" by history compaction.
     """
     context: List[Document] = []
+    summary: str = ""
 
 
 class Chatbot:
@@ -33,23 +81,49 @@ class Chatbot:
     The chatbot retrieves legal information from a database using Qdrant and interacts with users using a defined workflow graph.
 
     Args:
-        client: The Qdrant client instance used to query the Qdrant database.
+        pool: The QdrantPool used to query the Qdrant database.
         collection_name: The name of the collection in Qdrant from which legal information will be retrieved.
+        oversampling: Oversampling factor for quantized collections, or None to search without rescoring.
+        thai2vec: An embedder shared with the Qdrant adaptor, or None to create a new one.
+        speculative_threshold: Minimum similarity between the user message and a tool query
+            for the speculative retrieval result to be used.
+        history_token_limit: Token count of the stored conversation above which older turns are summarized.
+        keep_turns: Number of most recent turns always kept verbatim.
     """
-    def __init__(self, client, collection_name):
+    def __init__(
+        self,
+        pool,
+        collection_name,
+        oversampling=None,
+        thai2vec=None,
+        speculative_threshold=0.9,
+        history_token_limit=3000,
+        keep_turns=3,
+    ):
         """
         Initializes the chatbot with the required Qdrant client, LLM, embedding model, and workflow graph.
 
         Args:
-            client: The Qdrant client instance used to query the Qdrant database.
+            pool: The QdrantPool used to query the Qdrant database with timeouts, retries and hedging.
             collection_name: The name of the collection in Qdrant to retrieve legal information from.
+            oversampling: When set, the quantized index returns `limit * oversampling` candidates
+                which are rescored against the original float32 vectors.
+            thai2vec: An already constructed Thai2VecEmbedder to reuse so the thai2fit model is only loaded once.
+            speculative_threshold: Minimum `difflib` similarity ratio between the user message and
+                a retrieve tool query for the speculative result to be used instead of a new search.
+            history_token_limit: When the messages and summary of a thread exceed this many tokens
+                (tiktoken o200k_base), turns older than the last `keep_turns` are folded into the summary.
+            keep_turns: Number of most recent turns (a user message and everything answering it)
+                that are never summarized.
         """
         load_dotenv(override=True)
 
-        self.client = client
+        self.pool = pool
         self.llm = OpenAI(temperature=0.5, api_key=os.getenv("OPENAI_API_KEY"))
-        self.thai2vec = Thai2VecEmbedder()
+        self.thai2vec = thai2vec or Thai2VecEmbedder()
         self.collection_name = collection_name
+        self.current_version_filter = current_version_filter()
+        self.search_params = quantized_search_params(oversampling)
 
         @tool(response_format="content_and_artifact")
         def retrieve(query: str):
@@ -62,37 +136,228 @@ class Chatbot:
             Returns:
                 tuple: A tuple containing the serialized documents and the list of retrieved documents.
             """
-            query_vector = self.thai2vec.get_embedding(query)
-            search_results = self.client.query_points(
-                collection_name=self.collection_name,
-                query=query_vector,
-                limit=10,
-            ).points
-
-            retrieved_docs = [
-                Document(
-                    page_content=point.payload["page_content"],
-                    metadata=point.payload["metadata"],
-                )
-                for point in search_results
-            ]
+            retrieved_docs = self.retrieve_batch([query])[0]
+            return self.serialize_documents(retrieved_docs), retrieved_docs
 
-            serialized = "\n\n".join(
-                f"--- Document Start ---\n"
-                f"Page Content:\n{doc.page_content}\n\n"
-                f"Metadata:\n{doc.metadata}\n"
-                f"--- Document End ---"
-                for doc in retrieved_docs
-            )
-            return serialized, retrieved_docs
-
-        set_llm_cache(InMemoryCache())
         self.retrieve = retrieve
-        self.llm = ChatOpenAI(model="gpt-4o", max_tokens=8000)
+        # Each collection's chatbot has its own cache, so answers never leak across knowledge bases.
+        self.llm = ChatOpenAI(model="gpt-4o", max_tokens=8000, cache=InMemoryCache())
         self.memory = MemorySaver()
-        self.config = {"configurable":{"thread_id": str(uuid.uuid4())}}
+        # Default thread for callers that do not pass their own thread_id
+        self.thread_id = str(uuid.uuid4())
+        self.speculative_threshold = speculative_threshold
+        self.speculations = {}
+        self.speculation_stats = {"hits": 0, "misses": 0}
+        self.histograms = {
+            "retrieve": LatencyHistogram(),
+            "first_token": LatencyHistogram(),
+            "response": LatencyHistogram(),
+        }
+        self.tokenizer = tiktoken.get_encoding("o200k_base")
+        self.history_token_limit = history_token_limit
+        self.keep_turns = max(1, keep_turns)
+        self.executor = ThreadPoolExecutor(max_workers=4)
         self.graph = self._build_graph(self.memory)
-        self.metadata = None
+        # Citations of the last generated answer, per thread
+        self.metadata = {}
+
+    def retrieve_batch(
+        self, queries: List[str], limit: int = 10, deduplicate: bool = True
+    ) -> List[List[Document]]:
+        """
+        Retrieve documents for several queries with a single Qdrant round-trip.
+
+        All queries are embedded together and sent as one `query_batch_points` request.
+
+        Args:
+            queries (List[str]): The queries to retrieve documents for.
+            limit (int): The number of hits per query.
+            deduplicate (bool): Whether to drop hits already returned for an earlier query.
+
+        Returns:
+            List[List[Document]]: The retrieved documents for each query, in query order.
+        """
+        start = time.perf_counter()
+        query_vectors = self.thai2vec.embed_documents(queries)
+        requests = [
+            QueryRequest(
+                query=query_vector.tolist(),
+                filter=self.current_version_filter,
+                limit=limit,
+                params=self.search_params,
+                with_payload=True,
+            )
+            for query_vector in query_vectors
+            if query_vector is not None
+        ]
+
+        responses = iter(
+            self.pool.read(
+                "query_batch",
+                lambda c: c.query_batch_points(
+                    collection_name=self.collection_name, requests=requests
+                ),
+            )
+            if requests
+            else []
+        )
+
+        results = []
+        for query_vector in query_vectors:
+            retrieved_docs = []
+            if query_vector is not None:
+                retrieved_docs = [
+                    Document(
+                        id=str(point.id),
+                        page_content=point.payload["page_content"],
+                        metadata=point.payload["metadata"],
+                    )
+                    for point in next(responses).points
+                ]
+            results.append(retrieved_docs)
+        self.histograms["retrieve"].observe(time.perf_counter() - start)
+        return self.deduplicate_documents(results) if deduplicate else results
+
+    def metrics(self) -> dict:
+        """
+        Describe this chatbot's retrieval and response latencies and speculation hit rate.
+
+        Returns:
+            dict: Latency histograms for retrieval, first streamed token and full response,
+                  plus the speculative retrieval hit and miss counts.
+        """
+        return {
+            "latency": {
+                name: histogram.snapshot() for name, histogram in self.histograms.items()
+            },
+            "speculation": dict(self.speculation_stats),
+        }
+
+    @staticmethod
+    def deduplicate_documents(results: List[List[Document]]) -> List[List[Document]]:
+        """
+        Drop documents already returned for an earlier query, matching on point id.
+
+        Args:
+            results (List[List[Document]]): The retrieved documents for each query.
+
+        Returns:
+            List[List[Document]]: The results where each point appears only for the first query that retrieved it.
+        """
+        seen_ids = set()
+        deduplicated = []
+        for retrieved_docs in results:
+            unique_docs = []
+            for doc in retrieved_docs:
+                if doc.id in seen_ids:
+                    continue
+                seen_ids.add(doc.id)
+                unique_docs.append(doc)
+            deduplicated.append(unique_docs)
+        return deduplicated
+
+    def _is_speculation_match(self, speculative_query: str, query: str) -> bool:
+        """
+        Check whether a tool query is close enough to the user message to reuse its speculative retrieval.
+
+        Args:
+            speculative_query (str): The user message retrieval was started for.
+            query (str): The query of a retrieve tool call.
+
+        Returns:
+            bool: True if the similarity ratio reaches `speculative_threshold`.
+        """
+        a = "".join(speculative_query.split())
+        b = "".join(query.split())
+        return (
+            a == b
+            or difflib.SequenceMatcher(None, a, b).ratio() >= self.speculative_threshold
+        )
+
+    @staticmethod
+    def serialize_documents(documents: List[Document]) -> str:
+        """
+        Serialize retrieved documents into the text passed to the LLM.
+
+        Args:
+            documents (List[Document]): The retrieved documents.
+
+        Returns:
+            str: The serialized documents.
+        """
+        return "\n\n".join(
+            f"--- Document Start ---\n"
+            f"Page Content:\n{doc.page_content}\n\n"
+            f"Metadata:\n{doc.metadata}\n"
+            f"--- Document End ---"
+            for doc in documents
+        )
+
+    def count_history_tokens(self, messages: list, summary: str = "") -> int:
+        """
+        Count the tokens of a conversation history as it would be sent to the LLM.
+
+        Args:
+            messages (list): The messages of the thread.
+            summary (str): The running summary of earlier turns.
+
+        Returns:
+            int: The number of tiktoken tokens.
+        """
+        text = summary + "".join(str(message.content) for message in messages)
+        return len(self.tokenizer.encode(text, disallowed_special=()))
+
+    def summarize_turns(self, summary: str, messages: list) -> str:
+        """
+        Fold older turns into the running summary with one LLM call.
+
+        Only user messages and final answers are summarized; retrieved documents are
+        not carried over, since the next retrieval fetches what is needed again.
+
+        Args:
+            summary (str): The current running summary, or "" if there is none yet.
+            messages (list): The messages of the turns to fold in.
+
+        Returns:
+            str: The updated summary.
+        """
+        transcript = "\n".join(
+            f"{'User' if message.type == 'human' else 'Assistant'}: {message.content}"
+            for message in messages
+            if message.type == "human"
+            or (message.type == "ai" and not message.tool_calls and message.content)
+        )
+        instructions = (
+            "You maintain a running summary of a medical question-answering conversation. "
+            "Update the existing summary with the new conversation turns. Keep the patient's "
+            "details, the questions asked and the key facts of the answers, in Thai, in at most 150 words."
+        )
+        response = self.llm.invoke(
+            [
+                SystemMessage(instructions),
+                HumanMessage(
+                    f'existing summary: """{summary}"""\n\nnew turns:\n"""{transcript}"""'
+                ),
+            ],
+            max_tokens=400,
+        )
+        return response.content
+
+    @staticmethod
+    def summary_messages(state: State) -> list:
+        """
+        The system message carrying the running summary, if the thread has one.
+
+        Args:
+            state (State): The current state.
+
+        Returns:
+            list: A list with the summary SystemMessage, or an empty list.
+        """
+        summary = state.get("summary")
+        if not summary:
+            return []
+        return [SystemMessage(f"Summary of the earlier conversation: {summary}")]
 
     def _build_graph(self, memory):
         """
@@ -119,19 +384,101 @@ class Chatbot:
             thai_prompt = (
                 "Respond only in Thai, regardless of the language of the received message, and use male pronouns and speech style."
             )
-            state["messages"].insert(0, {"role": "system", "content": thai_prompt})
+            messages = (
+                [{"role": "system", "content": thai_prompt}]
+                + self.summary_messages(state)
+                + state["messages"]
+            )
             llm_with_tools = self.llm.bind_tools([self.retrieve])
-            response = llm_with_tools.invoke(state["messages"])
+            response = llm_with_tools.invoke(messages)
             return {"messages": [response]}
 
-        tools = ToolNode([self.retrieve])
+        def tools(state: State, config: RunnableConfig):
+            """
+            Run every retrieve tool call of the last AI message in one batched Qdrant request.
+
+            A query close enough to the user message reuses the speculative retrieval started
+            by `stream_response`; the remaining queries are sent together. If the speculative
+            retrieval failed, its query is retried with the others. If that request fails too,
+            its tool calls get error ToolMessages, as `ToolNode` would return, so the turn
+            still completes and every tool call keeps a matching ToolMessage.
+
+            Args:
+                state (State): The current state containing "messages" to be processed.
+                config (RunnableConfig): The run configuration, used to find this thread's speculation.
+
+            Returns:
+                dict: A dictionary containing one tool message per tool call.
+            """
+            tool_calls = state["messages"][-1].tool_calls
+            queries = [tool_call["args"].get("query", "") for tool_call in tool_calls]
 
-        def generate(state: State):
+            speculation = self.speculations.pop(
+                config["configurable"]["thread_id"], None
+            )
+            results = [None] * len(queries)
+            if speculation:
+                speculative_query, speculative_future = speculation
+                for i, query in enumerate(queries):
+                    if self._is_speculation_match(speculative_query, query):
+                        try:
+                            results[i] = speculative_future.result()[0]
+                            self.speculation_stats["hits"] += 1
+                        except Exception as e:
+                            print(f"Speculative retrieval failed, retrying: {e!r}")
+                            self.speculation_stats["misses"] += 1
+                        break
+                else:
+                    # Only drops the retrieval if it has not started yet; a running one
+                    # finishes in the background and its result is discarded.
+                    speculative_future.cancel()
+                    self.speculation_stats["misses"] += 1
+
+            remaining = [i for i, result in enumerate(results) if result is None]
+            error = None
+            if remaining:
+                try:
+                    fetched = self.retrieve_batch(
+                        [queries[i] for i in remaining], deduplicate=False
+                    )
+                except Exception as e:
+                    print(f"Retrieval failed: {e!r}")
+                    error = e
+                    fetched = [[] for _ in remaining]
+                for i, retrieved_docs in zip(remaining, fetched):
+                    results[i] = retrieved_docs
+            results = self.deduplicate_documents(results)
+
+            messages = []
+            for i, (tool_call, retrieved_docs) in enumerate(zip(tool_calls, results)):
+                if error is not None and i in remaining:
+                    messages.append(
+                        ToolMessage(
+                            content=f"Error: {error!r}\n Please fix your mistakes.",
+                            artifact=[],
+                            tool_call_id=tool_call["id"],
+                            name=tool_call["name"],
+                            status="error",
+                        )
+                    )
+                else:
+                    messages.append(
+                        ToolMessage(
+                            content=self.serialize_documents(retrieved_docs),
+                            artifact=retrieved_docs,
+                            tool_call_id=tool_call["id"],
+                            name=tool_call["name"],
+                        )
+                    )
+            return {"messages": messages}
+
+        def generate(state: State, config: RunnableConfig):
             """
             Generate an answer based on the context and the query.
 
             Args:
                 state (State): The current state containing "messages" to be processed.
+                config (RunnableConfig): The run configuration, used to record this thread's citations.
 
             Returns:
                 dict: A dictionary containing the "messages" with a generated response.
@@ -157,13 +504,11 @@ class Chatbot:
 
             for key in context:
                 context[key] = sorted([element + 1 for element in context[key]])
-            self.metadata = context
+            self.metadata[config["configurable"]["thread_id"]] = context
 
             system_message_content = (
                 "You are an assistant for question-answering tasks. "
                 "Use the provided context to respond clearly, accurately, and do not exceed 80 words in Thai. "
-                "If multiple pieces of context have the same content, "
-                "use the one with the latest date from their metadata. "
                 "If the following context doesn't provide a direct answer, try to infer the answer from the existing information. "
                 "If you can't infer a direct answer, say 'ฉันไม่แน่ใจ แต่จากข้อมูลที่มีอยู่ ... '. Then, summarize the existing information to respond as best as you can."
                 "\n\n"
@@ -176,62 +521,130 @@ class Chatbot:
                 if message.type in ("human", "system")
                 or (message.type == "ai" and not message.tool_calls)
             ]
-            prompt = [SystemMessage(system_message_content)] + conversation_messages
+            prompt = (
+                [SystemMessage(system_message_content)]
+                + self.summary_messages(state)
+                + conversation_messages
+            )
 
             response = self.llm.invoke(prompt, max_tokens=150)
 
             return {"messages": [response]}
 
+        def compact_history(state: State):
+            """
+            Replace turns older than the last `keep_turns` with the running summary once
+            the thread exceeds `history_token_limit` tokens.
+
+            It runs after the answer has been streamed, so summarizing does not delay the
+            reply, and the next turn starts from a bounded history. Like every node, it runs in
+            a worker thread under `graph.astream`, off the event loop.
+
+            Args:
+                state (State): The current state containing "messages" and "summary".
+
+            Returns:
+                dict: The updated "summary" and RemoveMessage entries for the folded turns,
+                      or an empty dict when the history is still short.
+            """
+            messages = state["messages"]
+            summary = state.get("summary", "")
+            if self.count_history_tokens(messages, summary) <= self.history_token_limit:
+                return {}
+
+            turn_starts = [i for i, message in enumerate(messages) if message.type == "human"]
+            if len(turn_starts) <= self.keep_turns:
+                return {}
+
+            # Whole turns only, so a tool call is never separated from its ToolMessage.
+            old_messages = messages[: turn_starts[-self.keep_turns]]
+            return {
+                "summary": self.summarize_turns(summary, old_messages),
+                "messages": [RemoveMessage(id=message.id) for message in old_messages],
+            }
+
         graph_builder = StateGraph(State)
         graph_builder.add_node(query_or_respond)
         graph_builder.add_node(tools)
         graph_builder.add_node(generate)
+        graph_builder.add_node(compact_history)
         graph_builder.set_entry_point("query_or_respond")
         graph_builder.add_conditional_edges(
             "query_or_respond",
             tools_condition,
-            {END: END, "tools": "tools"},
+            {END: "compact_history", "tools": "tools"},
         )
         graph_builder.add_edge("tools", "generate")
-        graph_builder.add_edge("generate", END)
+        graph_builder.add_edge("generate", "compact_history")
+        graph_builder.add_edge("compact_history", END)
         return graph_builder.compile(checkpointer=memory)
 
-    async def async_wrapper(self, generator):
-        """
-        Wrap a generator to allow for async iteration.
-
-        Args:
-            generator: The generator to be wrapped for async iteration.
-
-        Yields:
-            item: Each item yielded by the generator, asynchronously.
-        """
-        for item in generator:
-            yield item
-            await asyncio.sleep(0)
-
-    async def stream_response(self, query: str):
+    async def stream_response(self, query: str, thread_id: str | None = None):
         """
         Process a user message through the graph and yield results in real-time.
 
+        Conversation history, summary, speculative retrieval and citations are kept per
+        thread, so concurrent conversations with the same chatbot stay separate.
+
         Args:
             query (str): The user input message for the chatbot to process.
+            thread_id (str | None, optional): The conversation thread, typically one per
+                                              connection. Defaults to this chatbot's own thread.
 
         Yields:
             tuple: A tuple containing the response content, source (either "RAG" or "LLM"), and metadata.
         """
         print("query message :", query)
+        start = time.perf_counter()
+        first_token = True
+        thread_id = thread_id or self.thread_id
+        config = {"configurable": {"thread_id": thread_id}}
+
+        # Most tool queries are the user message itself, so start retrieving it now,
+        # overlapping the routing LLM call. The tools node uses or discards the result.
+        self.speculations[thread_id] = (
+            query,
+            self.executor.submit(self.retrieve_batch, [query]),
+        )
 
-        langchain_graph_step = self.async_wrapper(
-            self.graph.stream(
-                {"messages": [{"role": "user", "content": query}]},
-                stream_mode="messages",
-                config=self.config,
-            )
+        # astream runs the synchronous nodes (LLM calls, retrieval, history compaction) in
+        # worker threads, so a slow node never blocks the other connections' event loop.
+        langchain_graph_step = self.graph.astream(
+            {"messages": [{"role": "user", "content": query}]},
+            stream_mode="messages",
+            config=config,
         )
 
         async for message, metadata in langchain_graph_step:
+            if metadata["langgraph_node"] not in ("generate", "query_or_respond"):
+                continue
+            if first_token and message.content:
+                first_token = False
+                self.histograms["first_token"].observe(time.perf_counter() - start)
             if metadata["langgraph_node"] == "generate":
-                yield message.content, "RAG", str(self.metadata)
-            elif metadata["langgraph_node"] == "query_or_respond":
+                yield message.content, "RAG", str(self.metadata.get(thread_id))
+            else:
                 yield message.content, "LLM", None
+        self.histograms["response"].observe(time.perf_counter() - start)
+
+        # The LLM answered directly without calling the retrieve tool. As above, this
+        # only drops a retrieval that has not started; a running one is discarded.
+        speculation = self.speculations.pop(thread_id, None)
+        if speculation:
+            speculation[1].cancel()
+        self.metadata.pop(thread_id, None)
+
+    def end_thread(self, thread_id: str):
+        """
+        Drop a finished conversation thread's history and summary from memory.
+
+        Args:
+            thread_id (str): The thread passed to `stream_response`.
+        """
+        self.memory.storage.pop(thread_id, None)
+        for key in [key for key in self.memory.writes if key[0] == thread_id]:
+            del self.memory.writes[key]
+        self.metadata.pop(thread_id, None)
+        speculation = self.speculations.pop(thread_id, None)
+        if speculation:
+            speculation[1].cancel()
@@ -0,0 +1,225 @@
+import hashlib
+import sys
+
+import numpy as np
+
+
+def word_hash(word: str) -> int:
+    """
+    A stable 64-bit hash of a word, identical across processes and Python versions.
+
+    Args:
+        word (str): The word to hash.
+
+    Returns:
+        int: The unsigned 64-bit hash.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def dict_nbytes(index: dict) -> int:
+    """
+    The approximate memory held by a str -> int dict: the hash table, keys and values.
+
+    Args:
+        index (dict): The dict to measure.
+
+    Returns:
+        int: The size in bytes.
+    """
+    return sys.getsizeof(index) + sum(
+        sys.getsizeof(key) + sys.getsizeof(value) for key, value in index.items()
+    )
+
+
+class CompactWordVectors:
+    """
+    A reduced, quantized word vector table that can replace the gensim thai2fit model.
+
+    The table keeps the corpus vocabulary plus the most frequent words, stored as float16
+    or as int8 with one float32 scale per row. Words of the full vocabulary that were pruned
+    map to one of a few hashed fallback buckets holding the mean vector of the pruned words
+    that hash there. Words that were never in the full vocabulary stay unknown, as in the
+    original model. It supports `token in table` and `table[token]` like gensim KeyedVectors.
+
+    The kept words are stored as one UTF-8 blob with row offsets rather than a fixed-width
+    string array, which would pad every word to the length of the longest one.
+
+    Attributes:
+        word_bytes (np.ndarray): The kept words, UTF-8 encoded and concatenated (uint8).
+        word_offsets (np.ndarray): Start offset of each word in `word_bytes`, plus the end.
+        index (dict): Kept word -> row.
+        vectors (np.ndarray): The kept vectors, int8 or float16.
+        scales (np.ndarray | None): Per-row float32 scales for int8 vectors.
+        bucket_vectors (np.ndarray): The fallback bucket vectors.
+        pruned_hashes (np.ndarray): Sorted 64-bit hashes of the pruned words.
+    """
+
+    def __init__(
+        self, word_bytes, word_offsets, vectors, scales, bucket_vectors, pruned_hashes
+    ):
+        """
+        Initialize the CompactWordVectors from its arrays. Use `load` or `build` instead.
+        """
+        self.word_bytes = word_bytes
+        self.word_offsets = word_offsets
+        self.vectors = vectors
+        self.scales = scales
+        self.bucket_vectors = bucket_vectors
+        self.pruned_hashes = pruned_hashes
+        blob = word_bytes.tobytes()
+        offsets = word_offsets.tolist()
+        self.index = {
+            blob[start:end].decode("utf-8"): i
+            for i, (start, end) in enumerate(zip(offsets, offsets[1:]))
+        }
+
+    @staticmethod
+    def encode_words(words: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Encode words as a UTF-8 blob and offsets.
+
+        Args:
+            words (list[str]): The words.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The uint8 blob and the int64 offsets (len(words) + 1).
+        """
+        encoded = [word.encode("utf-8") for word in words]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(word) for word in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8).copy(), offsets
+
+    @classmethod
+    def load(cls, path: str) -> "CompactWordVectors":
+        """
+        Load a table written by `build`.
+
+        Args:
+            path (str): The .npz file path.
+
+        Returns:
+            CompactWordVectors: The loaded table.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            scales = data["scales"] if data["scales"].size else None
+            return cls(
+                data["word_bytes"],
+                data["word_offsets"],
+                data["vectors"],
+                scales,
+                data["bucket_vectors"],
+                data["pruned_hashes"],
+            )
+
+    @staticmethod
+    def build(
+        model,
+        keep_words: set[str],
+        path: str,
+        dtype: str = "int8",
+        num_buckets: int = 2048,
+    ):
+        """
+        Build a reduced table from a full gensim KeyedVectors model and save it.
+
+        Args:
+            model: The full gensim KeyedVectors model.
+            keep_words (set[str]): The words to keep exactly.
+            path (str): The .npz file path to write.
+            dtype (str, optional): "int8" (per-row scale) or "float16". Defaults to "int8".
+            num_buckets (int, optional): Number of hashed fallback buckets. Defaults to 2048.
+        """
+        if dtype not in ("int8", "float16"):
+            raise ValueError(f"Unsupported dtype '{dtype}'. Use 'int8' or 'float16'.")
+
+        kept = [word for word in model.index_to_key if word in keep_words]
+        pruned = [word for word in model.index_to_key if word not in keep_words]
+        full_vectors = np.asarray(
+            [model[word] for word in kept], dtype=np.float32
+        ).reshape(len(kept), model.vector_size)
+
+        if dtype == "int8":
+            scales = np.abs(full_vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            vectors = np.round(full_vectors / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+        else:
+            scales = np.empty(0, dtype=np.float32)
+            vectors = full_vectors.astype(np.float16)
+
+        bucket_sums = np.zeros((num_buckets, model.vector_size), dtype=np.float64)
+        bucket_counts = np.zeros(num_buckets, dtype=np.int64)
+        pruned_hashes = np.empty(len(pruned), dtype=np.uint64)
+        for i, word in enumerate(pruned):
+            h = word_hash(word)
+            pruned_hashes[i] = h
+            bucket_sums[h % num_buckets] += model[word]
+            bucket_counts[h % num_buckets] += 1
+        bucket_vectors = (bucket_sums / np.maximum(bucket_counts, 1)[:, None]).astype(
+            np.float16
+        )
+
+        word_bytes, word_offsets = CompactWordVectors.encode_words(kept)
+        np.savez_compressed(
+            path,
+            word_bytes=word_bytes,
+            word_offsets=word_offsets,
+            vectors=vectors,
+            scales=scales,
+            bucket_vectors=bucket_vectors,
+            pruned_hashes=np.sort(pruned_hashes),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory held by the table: its arrays plus the word -> row dict.
+        """
+        return (
+            self.word_bytes.nbytes
+            + self.word_offsets.nbytes
+            + dict_nbytes(self.index)
+            + self.vectors.nbytes
+            + (self.scales.nbytes if self.scales is not None else 0)
+            + self.bucket_vectors.nbytes
+            + self.pruned_hashes.nbytes
+        )
+
+    @property
+    def vector_size(self) -> int:
+        """
+        The dimension of the word vectors.
+        """
+        return self.vectors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.word_offsets) - 1
+
+    def _pruned_bucket(self, word: str) -> int | None:
+        """
+        The fallback bucket of a pruned word, or None if the word was never in the full vocabulary.
+        """
+        h = np.uint64(word_hash(word))
+        position = np.searchsorted(self.pruned_hashes, h)
+        if position < len(self.pruned_hashes) and self.pruned_hashes[position] == h:
+            return int(h % np.uint64(len(self.bucket_vectors)))
+        return None
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.index or self._pruned_bucket(word) is not None
+
+    def __getitem__(self, word: str) -> np.ndarray:
+        i = self.index.get(word)
+        if i is not None:
+            vector = self.vectors[i].astype(np.float32)
+            if self.scales is not None:
+                vector *= self.scales[i]
+            return vector
+
+        bucket = self._pruned_bucket(word)
+        if bucket is None:
+            raise KeyError(f"Word '{word}' not in vocabulary.")
+        return self.bucket_vectors[bucket].astype(np.float32)
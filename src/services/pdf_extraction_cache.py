@@ -0,0 +1,169 @@
+import gzip
+import json
+import logging
+import os
+import uuid
+from importlib import metadata
+from typing import TYPE_CHECKING
+
+from utilities.file_utils import file_sha256
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+class PdfExtractionCache:
+    """
+    A disk cache of per-page PDF text keyed by the file content hash and the extractor version.
+
+    Each entry is a gzip-compressed JSON list of pages, so re-ingesting the same PDF (after a
+    chunking or cleaning change, or a collection rebuild) skips PDF parsing entirely. Entries
+    are evicted least-recently-used first once the cache grows past `max_bytes`.
+
+    Attributes:
+        cache_dir (str): The directory holding the cache entries.
+        max_bytes (int): The maximum total size of the cache entries.
+        extractor_version (str): Identifies the extractor; part of every cache key.
+    """
+
+    CACHE_FORMAT = 1
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Initialize the PdfExtractionCache.
+
+        Args:
+            cache_dir (str): The directory holding the cache entries. Created if missing.
+            max_bytes (int, optional): The maximum total size of the cache. Defaults to 1 GiB.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.extractor_version = (
+            f"pypdf-{metadata.version('pypdf')}"
+            f"_lc-{metadata.version('langchain-community')}"
+            f"_f{self.CACHE_FORMAT}"
+        )
+
+    @classmethod
+    def from_env(cls) -> "PdfExtractionCache | None":
+        """
+        Create a cache from the PDF_CACHE_DIR and PDF_CACHE_MAX_MB environment variables.
+
+        Returns:
+            PdfExtractionCache | None: The cache, or None if PDF_CACHE_DIR is set to an empty string.
+        """
+        cache_dir = os.getenv("PDF_CACHE_DIR", "./data/.pdf_cache")
+        if not cache_dir:
+            return None
+        max_mb = int(os.getenv("PDF_CACHE_MAX_MB", "1024"))
+        return cls(cache_dir, max_bytes=max_mb * 1024 * 1024)
+
+    def _entry_path(self, file_hash: str) -> str:
+        """
+        Build the cache entry path for a file hash.
+
+        Args:
+            file_hash (str): SHA-256 of the PDF content.
+
+        Returns:
+            str: The path of the cache entry.
+        """
+        return os.path.join(
+            self.cache_dir, f"{file_hash}_{self.extractor_version}.json.gz"
+        )
+
+    def load(self, pdf_path: str, file_hash: str | None = None) -> list["Document"]:
+        """
+        Load the pages of a PDF, from the cache when possible.
+
+        Args:
+            pdf_path (str): The file path of the PDF.
+            file_hash (str | None, optional): SHA-256 of the PDF content, computed when omitted.
+
+        Returns:
+            list[Document]: One Document per page, with `source` set to `pdf_path`.
+        """
+        from langchain_core.documents import Document
+
+        file_hash = file_hash or file_sha256(pdf_path)
+        entry_path = self._entry_path(file_hash)
+
+        try:
+            with gzip.open(entry_path, "rt", encoding="utf-8") as f:
+                pages = json.load(f)
+            os.utime(entry_path)  # Mark as recently used for eviction
+            logging.info(f"Loaded '{pdf_path}' pages from extraction cache.")
+            return [
+                Document(
+                    page_content=page["page_content"],
+                    metadata={**page["metadata"], "source": pdf_path},
+                )
+                for page in pages
+            ]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring corrupt extraction cache entry '{entry_path}': {e}")
+
+        from langchain_community.document_loaders import PyPDFLoader
+
+        documents = PyPDFLoader(pdf_path).load()
+        self._store(
+            entry_path,
+            [
+                {"page_content": doc.page_content, "metadata": doc.metadata}
+                for doc in documents
+            ],
+        )
+        self.evict()
+        return documents
+
+    def _store(self, entry_path: str, pages: list[dict]):
+        """
+        Atomically write a cache entry.
+
+        Args:
+            entry_path (str): The path of the cache entry.
+            pages (list[dict]): The pages to store.
+        """
+        tmp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(pages, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            logging.warning(f"Could not write extraction cache entry '{entry_path}': {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries until the cache fits in `max_bytes`.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        entries = []
+        total_bytes = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json.gz"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_bytes += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+        return removed
@@ -0,0 +1,186 @@
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+class ThaiTokenChunker:
+    """
+    A text splitter that cuts Thai text on PyThaiNLP sentence and word boundaries.
+
+    Chunks are sized by tiktoken token count instead of characters, so a split never lands
+    in the middle of a Thai word. Sentences longer than a chunk are split on word boundaries.
+    Each page is chunked separately, so every chunk keeps the page metadata of its source.
+
+    Attributes:
+        chunk_tokens (int): The maximum number of tokens per chunk.
+        overlap_tokens (int): The maximum number of trailing tokens repeated in the next chunk.
+        sentence_engine (str): The PyThaiNLP sentence tokenizer engine.
+        tokenizer: A tokenizer object from the `tiktoken` library for counting tokens.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: int = 400,
+        overlap_tokens: int = 40,
+        sentence_engine: str = "whitespace+newline",
+        encoding_name: str = "o200k_base",
+    ):
+        """
+        Initialize the ThaiTokenChunker.
+
+        Args:
+            chunk_tokens (int, optional): The maximum number of tokens per chunk. Defaults to 400.
+            overlap_tokens (int, optional): Tokens of trailing sentences repeated in the next chunk.
+                                            Defaults to 40.
+            sentence_engine (str, optional): The PyThaiNLP `sent_tokenize` engine.
+                                             Defaults to "whitespace+newline".
+            encoding_name (str, optional): The tiktoken encoding used to count tokens.
+                                           Defaults to "o200k_base".
+        """
+        import tiktoken
+
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens.")
+
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.sentence_engine = sentence_engine
+        self.tokenizer = tiktoken.get_encoding(encoding_name)
+
+    @classmethod
+    def from_env(cls) -> "ThaiTokenChunker":
+        """
+        Create a chunker from the CHUNK_TOKENS and CHUNK_OVERLAP_TOKENS environment variables.
+
+        Returns:
+            ThaiTokenChunker: The configured chunker.
+        """
+        return cls(
+            chunk_tokens=int(os.getenv("CHUNK_TOKENS", "400")),
+            overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "40")),
+        )
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tiktoken tokens in a string.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return len(self.tokenizer.encode(text, disallowed_special=()))
+
+    def _split_long_sentence(self, sentence: str) -> list[str]:
+        """
+        Split a sentence longer than `chunk_tokens` on word boundaries.
+
+        Args:
+            sentence (str): The sentence to split.
+
+        Returns:
+            list[str]: Pieces of at most `chunk_tokens` tokens each.
+        """
+        from pythainlp.tokenize import word_tokenize
+
+        pieces = []
+        current = ""
+        current_tokens = 0
+        for word in word_tokenize(sentence, keep_whitespace=True):
+            word_tokens = self.count_tokens(word)
+            if current and current_tokens + word_tokens > self.chunk_tokens:
+                pieces.append(current)
+                current, current_tokens = "", 0
+            current += word
+            current_tokens += word_tokens
+        if current.strip():
+            pieces.append(current)
+        return pieces
+
+    def _units(self, text: str) -> list[tuple[str, int]]:
+        """
+        Break text into sentences (or word-bounded pieces of long sentences) with their token counts.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            list[tuple[str, int]]: The units and their token counts, in order.
+        """
+        from pythainlp.tokenize import sent_tokenize
+
+        units = []
+        for sentence in sent_tokenize(text, engine=self.sentence_engine):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            sentence_tokens = self.count_tokens(sentence)
+            if sentence_tokens <= self.chunk_tokens:
+                units.append((sentence, sentence_tokens))
+            else:
+                units.extend(
+                    (piece, self.count_tokens(piece))
+                    for piece in self._split_long_sentence(sentence)
+                )
+        return units
+
+    def split_text(self, text: str) -> list[str]:
+        """
+        Split text into chunks of at most `chunk_tokens` tokens.
+
+        Consecutive chunks share whole trailing sentences worth at most `overlap_tokens` tokens.
+
+        Args:
+            text (str): The input text.
+
+        Returns:
+            list[str]: The chunks.
+        """
+        chunks = []
+        current = []
+        current_tokens = 0
+        for unit, unit_tokens in self._units(text):
+            if current and current_tokens + unit_tokens > self.chunk_tokens:
+                chunks.append(" ".join(u for u, _ in current))
+
+                overlap = []
+                overlap_tokens = 0
+                for u, t in reversed(current):
+                    if overlap_tokens + t > self.overlap_tokens:
+                        break
+                    overlap.insert(0, (u, t))
+                    overlap_tokens += t
+                current, current_tokens = overlap, overlap_tokens
+
+                while current and current_tokens + unit_tokens > self.chunk_tokens:
+                    current_tokens -= current.pop(0)[1]
+
+            current.append((unit, unit_tokens))
+            current_tokens += unit_tokens
+
+        if current:
+            chunks.append(" ".join(u for u, _ in current))
+        return chunks
+
+    def split_documents(self, documents: list["Document"]) -> list["Document"]:
+        """
+        Split page documents into chunks that keep the metadata of their page.
+
+        Args:
+            documents (list[Document]): One Document per PDF page.
+
+        Returns:
+            list[Document]: The chunks, each with a copy of its page's metadata.
+        """
+        from langchain_core.documents import Document
+
+        chunks = []
+        for document in documents:
+            for text in self.split_text(document.page_content):
+                chunks.append(
+                    Document(page_content=text, metadata=document.metadata.copy())
+                )
+        return chunks
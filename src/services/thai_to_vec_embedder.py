@@ -1,5 +1,6 @@
-from pythainlp import word_vector
-from pythainlp.tokenize import word_tokenize
+import os
+import threading
+
 import numpy as np
 
 
@@ -8,17 +9,62 @@ class Thai2VecEmbedder:
     A class for generating embeddings for Thai text using the Thai2Fit WordVector model.
 
     This class provides methods to generate embeddings for individual queries or a list of documents
-    by averaging the word embeddings of the tokens in the text.
+    by averaging the word embeddings of the tokens in the text. The model and PyThaiNLP are only
+    loaded on first use (or by an explicit `load()` during warm-up) to keep imports cheap.
     """
 
-    def __init__(self):
+    def __init__(self, table_path: str | None = None):
         """
         Initialize the Thai2VecEmbedder.
 
+        Args:
+            table_path (str | None, optional): A reduced table built by `scripts.build_wordvec_table`
+                                               to load instead of the full gensim model.
+                                               Defaults to the WORDVEC_TABLE environment variable.
+
         Attributes:
-            model: A pretrained WordVector model (Thai2Fit) loaded via PyThaiNLP for generating word embeddings.
+            model: A pretrained WordVector model (Thai2Fit) loaded via PyThaiNLP, or a
+                   CompactWordVectors table, for generating word embeddings.
+        """
+        self.table_path = table_path or os.getenv("WORDVEC_TABLE") or None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """
+        The Thai2Fit word vector model, loaded on first access.
+        """
+        if self._model is None:
+            self.load()
+        return self._model
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether the word vector model has been loaded.
         """
-        self.model = word_vector.WordVector(model_name="thai2fit_wv").get_model()
+        return self._model is not None
+
+    def load(self):
+        """
+        Load the Thai2Fit word vector model if it is not loaded yet.
+
+        Returns:
+            The loaded word vector model.
+        """
+        with self._lock:
+            if self._model is None and self.table_path:
+                from services.compact_word_vectors import CompactWordVectors
+
+                self._model = CompactWordVectors.load(self.table_path)
+            elif self._model is None:
+                from pythainlp import word_vector
+
+                self._model = word_vector.WordVector(
+                    model_name="thai2fit_wv"
+                ).get_model()
+        return self._model
 
     def embed_documents(self, documents: list[str]) -> list[np.ndarray | None]:
         """
@@ -31,12 +77,13 @@ class Thai2VecEmbedder:
             list[np.ndarray | None]: A list of numpy arrays representing the document embeddings.
                                      If a document has no tokens with embeddings, None is returned for that document.
         """
+        from pythainlp.tokenize import word_tokenize
+
+        model = self.model
         embeddings = []
         for document in documents:
             tokens = word_tokenize(document)  # Tokenize the document into words
-            word_embeddings = [
-                self.model[token] for token in tokens if token in self.model
-            ]
+            word_embeddings = [model[token] for token in tokens if token in model]
             if word_embeddings:
                 avg_embedding = np.mean(word_embeddings, axis=0)
                 embeddings.append(avg_embedding)
@@ -55,8 +102,11 @@ class Thai2VecEmbedder:
             np.ndarray | None: A numpy array representing the query embedding.
                                If the query has no tokens with embeddings, None is returned.
         """
+        from pythainlp.tokenize import word_tokenize
+
+        model = self.model
         tokens = word_tokenize(query)  # Tokenize the query into words
-        embeddings = [self.model[token] for token in tokens if token in self.model]
+        embeddings = [model[token] for token in tokens if token in model]
         if embeddings:
             return np.mean(embeddings, axis=0)
         return None  # No valid embeddings found for the query
@@ -0,0 +1,85 @@
+# Tests for the bulk indexer's resume logic against local-mode (in-memory) Qdrant.
+#
+# PDF parsing is replaced by `fake_parse_and_embed`, a module-level function so the
+# worker processes can unpickle it.
+import uuid
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+
+import adaptors.qdrant_adaptors as qdrant_adaptors  # noqa: E402
+from adaptors.qdrant_pool import QdrantPool  # noqa: E402
+from scripts import bulk_index  # noqa: E402
+from utilities.file_utils import file_sha256  # noqa: E402
+
+CHUNKS_PER_FILE = 4
+
+
+def fake_parse_and_embed(pdf_path, file_hash, effective_date, vector_size, document_id=None):
+    payloads = [
+        {
+            "page_content": f"{pdf_path} {i}",
+            "metadata": {
+                "source": pdf_path,
+                "page": i,
+                "file_hash": file_hash,
+                "document_id": document_id,
+                "effective_date": effective_date,
+                "is_current": False,
+            },
+        }
+        for i in range(CHUNKS_PER_FILE)
+    ]
+    ids = [uuid.uuid4().hex for _ in payloads]
+    vectors = np.random.rand(len(ids), vector_size).astype(np.float32)
+    return pdf_path, file_hash, ids, vectors, payloads
+
+
+@pytest.fixture
+def adaptor(monkeypatch):
+    monkeypatch.setattr(qdrant_adaptors, "TextCleaner", lambda: None)
+    monkeypatch.setattr(
+        qdrant_adaptors.ThaiTokenChunker, "from_env", classmethod(lambda cls: None)
+    )
+    monkeypatch.setattr(bulk_index, "_init_worker", lambda: None)
+    monkeypatch.setattr(bulk_index, "_parse_and_embed", fake_parse_and_embed)
+    pool = QdrantPool(clients=[qdrant_client.QdrantClient(":memory:")])
+    return qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+
+
+def run(adaptor, directory, checkpoint):
+    return bulk_index.bulk_index(
+        adaptor,
+        str(directory),
+        str(checkpoint),
+        workers=1,
+        upload_batch_size=64,
+        upload_parallel=1,  # Local-mode Qdrant is not safe for concurrent writes
+        effective_date="2024-01-01 00:00:00.000000",
+    )
+
+
+def test_unfinished_file_is_reindexed(adaptor, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (corpus / name).write_bytes(name.encode())
+    checkpoint = tmp_path / "checkpoint.jsonl"
+
+    # An earlier run uploaded part of a.pdf and stopped before checkpointing it.
+    a_path = str(corpus / "a.pdf")
+    _, a_hash, ids, vectors, payloads = fake_parse_and_embed(
+        a_path, file_sha256(a_path), "2024-01-01 00:00:00.000000", adaptor.vector_size
+    )
+    adaptor.upload_points(ids[:2], vectors[:2], payloads[:2])
+
+    stats = run(adaptor, corpus, checkpoint)
+
+    assert stats["docs"] == 2
+    assert adaptor._count_point() == 2 * CHUNKS_PER_FILE
+    assert set(bulk_index.load_checkpoint(str(checkpoint))) == adaptor.list_file_hashes()
+
+    stats = run(adaptor, corpus, checkpoint)
+    assert stats["docs"] == 0 and stats["skipped"] == 2
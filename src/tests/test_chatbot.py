@@ -0,0 +1,269 @@
+# Tests for the Chatbot's retrieval, speculation and history compaction, run offline.
+#
+# The LLM is a scripted fake chat model, the embedder hashes text to a fixed random vector
+# and Qdrant runs in local mode (in memory). Skipped when the dependencies are missing.
+import asyncio
+import hashlib
+import time
+import uuid
+from typing import Any, Callable
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+pytest.importorskip("langgraph")
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from qdrant_client.models import Distance, PointStruct, VectorParams  # noqa: E402
+
+import services.chatbot as chatbot_module  # noqa: E402
+from adaptors.qdrant_pool import QdrantPool  # noqa: E402
+
+VECTOR_SIZE = 300
+SOURCES = ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def text_vector(text: str) -> np.ndarray:
+    """
+    A fixed random unit vector per text, so a query finds the chunk with the same text first.
+    """
+    seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=4).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(VECTOR_SIZE).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeEmbedder:
+    def embed_documents(self, texts):
+        return [text_vector(text) if text.strip() else None for text in texts]
+
+
+class FakeEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Answers each of the chatbot's prompts with `respond(messages)`.
+    """
+
+    respond: Callable[[list], AIMessage]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+
+def scripted_llm(tool_queries: dict | None = None) -> ScriptedChatModel:
+    """
+    An LLM that calls the retrieve tool with `tool_queries[user message]` (default: the
+    user message itself), answers "answer" and summarizes to "summary".
+    """
+    tool_queries = tool_queries or {}
+
+    def respond(messages):
+        instructions = messages[0].content
+        if instructions.startswith("You maintain a running summary"):
+            return AIMessage("summary")
+        if instructions.startswith("You are an assistant"):
+            return AIMessage("answer")
+        query = messages[-1].content
+        return AIMessage(
+            "",
+            tool_calls=[
+                {
+                    "name": "retrieve",
+                    "args": {"query": tool_queries.get(query, query)},
+                    "id": uuid.uuid4().hex,
+                }
+            ],
+        )
+
+    return ScriptedChatModel(respond=respond)
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(chatbot_module.tiktoken, "get_encoding", lambda name: FakeEncoding())
+
+    client = qdrant_client.QdrantClient(":memory:")
+    client.create_collection(
+        "kb", vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE)
+    )
+    client.upsert(
+        "kb",
+        points=[
+            PointStruct(
+                id=uuid.uuid4().hex,
+                vector=text_vector(source).tolist(),
+                payload={
+                    "page_content": source,
+                    "metadata": {"source": source, "page": 0, "is_current": True},
+                },
+            )
+            for source in SOURCES
+        ],
+    )
+    pool = QdrantPool(clients=[client])
+    bot = chatbot_module.Chatbot(pool, "kb", thai2vec=FakeEmbedder())
+    bot.llm = scripted_llm()
+    return bot
+
+
+def count_calls(monkeypatch, obj, name: str, fail: Callable[[int], bool] = lambda n: False):
+    """
+    Wrap `obj.name` to count its calls, raising on the calls where `fail(call number)` is true.
+    """
+    calls = []
+    original = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        if fail(len(calls)):
+            raise TimeoutError("Qdrant timed out")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(obj, name, wrapper)
+    return calls
+
+
+def chat(bot, query: str, thread_id: str = "t") -> list:
+    async def collect():
+        return [item async for item in bot.stream_response(query, thread_id)]
+
+    return asyncio.run(collect())
+
+
+def thread_messages(bot, thread_id: str = "t") -> list:
+    return bot.graph.get_state({"configurable": {"thread_id": thread_id}}).values["messages"]
+
+
+def test_retrieve_batch_sends_one_request(bot, monkeypatch):
+    reads = count_calls(monkeypatch, bot.pool, "read")
+
+    results = bot.retrieve_batch(["a.pdf", "", "a.pdf"], limit=2)
+
+    assert len(reads) == 1
+    assert results[0][0].page_content == "a.pdf"
+    assert results[1] == []
+    # Every hit of the repeated query was already returned for the first one.
+    assert results[2] == []
+
+    results = bot.retrieve_batch(["a.pdf", "a.pdf"], limit=2, deduplicate=False)
+    assert [doc.id for doc in results[0]] == [doc.id for doc in results[1]]
+
+
+def test_deduplicate_documents_keeps_first_occurrence():
+    a, b, c = (Document(id=i, page_content=i) for i in "abc")
+
+    results = chatbot_module.Chatbot.deduplicate_documents([[a, b], [b, c], [a]])
+
+    assert results == [[a, b], [c], []]
+
+
+def test_speculation_hit_reuses_retrieval(bot, monkeypatch):
+    retrievals = count_calls(monkeypatch, bot, "retrieve_batch")
+
+    chat(bot, "a.pdf")
+
+    assert bot.speculation_stats == {"hits": 1, "misses": 0}
+    assert len(retrievals) == 1
+
+
+def test_speculation_miss_retrieves_tool_query(bot, monkeypatch):
+    bot.llm = scripted_llm({"a.pdf": "b.pdf"})
+    retrievals = count_calls(monkeypatch, bot, "retrieve_batch")
+
+    chat(bot, "a.pdf")
+
+    assert bot.speculation_stats == {"hits": 0, "misses": 1}
+    assert len(retrievals) == 2
+    # Checkpointed artifacts come back as plain dicts.
+    assert thread_messages(bot)[-2].artifact[0]["page_content"] == "b.pdf"
+
+
+def test_failed_speculation_falls_back(bot, monkeypatch):
+    count_calls(monkeypatch, bot, "retrieve_batch", fail=lambda n: n == 1)
+
+    responses = chat(bot, "a.pdf")
+
+    assert bot.speculation_stats == {"hits": 0, "misses": 1}
+    assert responses[-1][:2] == ("answer", "RAG")
+    assert thread_messages(bot)[-2].artifact[0]["page_content"] == "a.pdf"
+
+
+def test_retrieval_error_becomes_error_tool_message(bot, monkeypatch):
+    count_calls(monkeypatch, bot, "retrieve_batch", fail=lambda n: True)
+
+    responses = chat(bot, "a.pdf")
+
+    assert responses[-1][0] == "answer"
+    messages = thread_messages(bot)
+    tool_call_ids = {
+        call["id"] for message in messages if message.type == "ai" for call in message.tool_calls
+    }
+    tool_messages = [message for message in messages if message.type == "tool"]
+    assert {message.tool_call_id for message in tool_messages} == tool_call_ids
+    assert all(message.status == "error" for message in tool_messages)
+
+    # The thread is still usable.
+    monkeypatch.undo()
+    assert chat(bot, "b.pdf")[-1][0] == "answer"
+
+
+def test_compact_history_folds_whole_turns(bot):
+    bot.history_token_limit = 1
+    bot.keep_turns = 1
+
+    chat(bot, "a.pdf")
+    state = bot.graph.get_state({"configurable": {"thread_id": "t"}}).values
+    assert not state.get("summary")
+    assert [message.type for message in state["messages"]] == ["human", "ai", "tool", "ai"]
+
+    chat(bot, "b.pdf")
+    state = bot.graph.get_state({"configurable": {"thread_id": "t"}}).values
+    assert state["summary"] == "summary"
+    # Only the last turn is kept, with its tool call and ToolMessage together.
+    assert [message.type for message in state["messages"]] == ["human", "ai", "tool", "ai"]
+    assert state["messages"][0].content == "b.pdf"
+
+
+def test_compaction_does_not_block_event_loop(bot, monkeypatch):
+    bot.history_token_limit = 1
+    bot.keep_turns = 1
+    chat(bot, "a.pdf")
+    # A slow summary call, standing in for a full LLM round-trip.
+    monkeypatch.setattr(
+        bot, "summarize_turns", lambda summary, messages: time.sleep(0.5) or "summary"
+    )
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        responses = [item async for item in bot.stream_response("b.pdf", "t")]
+        ticker.cancel()
+        return responses, ticks
+
+    responses, ticks = asyncio.run(main())
+
+    assert responses[-1][0] == "answer"
+    assert ticks >= 20
+    assert bot.graph.get_state({"configurable": {"thread_id": "t"}}).values["summary"] == "summary"
@@ -0,0 +1,175 @@
+# Tests for QdrantAdaptor against local-mode (in-memory) Qdrant.
+#
+# Skipped when qdrant-client, numpy or LangGraph is not installed. The text cleaner and chunker are
+# replaced because these tests upload vectors directly and never process text.
+import uuid
+
+import pytest
+
+np = pytest.importorskip("numpy")
+qdrant_client = pytest.importorskip("qdrant_client")
+pytest.importorskip("langgraph")
+
+import adaptors.qdrant_adaptors as qdrant_adaptors  # noqa: E402
+from adaptors.qdrant_pool import QdrantPool  # noqa: E402
+from services.chatbot import current_version_filter  # noqa: E402
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(qdrant_adaptors, "TextCleaner", lambda: None)
+    monkeypatch.setattr(
+        qdrant_adaptors.ThaiTokenChunker, "from_env", classmethod(lambda cls: None)
+    )
+    return QdrantPool(clients=[qdrant_client.QdrantClient(":memory:")])
+
+
+def add_points(adaptor, source: str, count: int = 5, **metadata):
+    """
+    Upload `count` random points whose payload names `source`, plus any extra metadata.
+    """
+    adaptor.upload_points(
+        [uuid.uuid4().hex for _ in range(count)],
+        np.random.rand(count, adaptor.vector_size).astype(np.float32),
+        [
+            {
+                "page_content": f"{source} {i}",
+                "metadata": {"source": source, "page": i, **metadata},
+            }
+            for i in range(count)
+        ],
+    )
+
+
+def test_snapshot_round_trip(pool, tmp_path):
+    source = qdrant_adaptors.QdrantAdaptor("source", pool=pool)
+    add_points(source, "a.pdf", count=700)
+
+    assert source.export_collection(str(tmp_path), batch_size=256) == 700
+
+    target = qdrant_adaptors.QdrantAdaptor("target", pool=pool)
+    assert target.import_collection(str(tmp_path), batch_size=256) == 700
+    assert target._count_point() == 700
+
+    point = pool.read("scroll", lambda c: c.scroll("source", limit=1, with_vectors=True))[0][0]
+    copy = pool.read("scroll", lambda c: c.retrieve("target", ids=[point.id], with_vectors=True))[0]
+    assert np.allclose(point.vector, copy.vector)
+    assert copy.payload == point.payload
+
+
+def test_rollback_skips_failed_rebuild(pool, tmp_path):
+    adaptor = qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+    add_points(adaptor, "a.pdf")
+    adaptor.export_collection(str(tmp_path))
+
+    first = adaptor.rebuild_collection(export_dir=str(tmp_path), replace_collection=True)
+    with pytest.raises(FileNotFoundError):
+        adaptor.rebuild_collection(export_dir=str(tmp_path / "missing"))
+    assert adaptor.rebuild_status["state"] == "failed"
+    assert adaptor.list_collection_versions() == [first]
+
+    second = adaptor.rebuild_collection(export_dir=str(tmp_path))
+    assert adaptor.resolve_alias() == second
+
+    assert adaptor.rollback_alias() == first
+    assert adaptor.resolve_alias() == first
+    assert adaptor._count_point() == 5
+
+    # A rollback is a swap, so rolling back again returns to the newer build.
+    assert adaptor.rollback_alias() == second
+
+
+def test_rebuild_refuses_physical_collection_before_building(pool, tmp_path):
+    adaptor = qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+    add_points(adaptor, "a.pdf")
+    adaptor.export_collection(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        adaptor.rebuild_collection(export_dir=str(tmp_path))
+    assert adaptor.list_collection_versions() == []
+    assert adaptor._count_point() == 5
+
+
+def test_catch_up_applies_deletions(pool):
+    live = qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+    add_points(live, "a.pdf")
+    target = qdrant_adaptors.QdrantAdaptor("kb__build", pool=pool)
+    add_points(target, "a.pdf")
+    add_points(target, "b.pdf")
+    live.rebuild_status = {"total": 2}
+
+    # b.pdf was deleted from the live collection while the target was being built.
+    live._catch_up(target, {"a.pdf": {}, "b.pdf": {}})
+
+    assert target._list_sources().keys() == {"a.pdf"}
+
+
+def test_delete_file_hash_keeps_other_files(pool):
+    adaptor = qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+    add_points(adaptor, "a.pdf", file_hash="aaa", document_id="a.pdf")
+    add_points(adaptor, "b.pdf", count=3, file_hash="bbb", document_id="b.pdf")
+
+    adaptor.delete_file_hash("aaa")
+
+    assert adaptor.list_file_hashes() == {"bbb"}
+    assert adaptor._count_point() == 3
+
+
+def current_sources(adaptor) -> set[str]:
+    """
+    The sources the chatbot's current-version filter lets through.
+    """
+    points = adaptor.pool.read(
+        "query",
+        lambda c: c.query_points(
+            adaptor.collection_name,
+            query=np.random.rand(adaptor.vector_size).tolist(),
+            query_filter=current_version_filter(),
+            limit=100,
+        ),
+    ).points
+    return {point.payload["metadata"]["source"] for point in points}
+
+
+def test_refresh_current_version_flags_latest(pool):
+    adaptor = qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+    for source, effective_date in (("v2.pdf", "2025-01-01"), ("v1.pdf", "2024-01-01")):
+        add_points(
+            adaptor,
+            source,
+            document_id="guideline",
+            effective_date=effective_date,
+            is_current=False,
+        )
+    add_points(adaptor, "other.pdf", document_id="other", is_current=True)
+
+    assert adaptor.refresh_current_version("guideline") == "v2.pdf"
+    assert current_sources(adaptor) == {"v2.pdf", "other.pdf"}
+
+    adaptor.delete_file("v2.pdf")
+    assert current_sources(adaptor) == {"v1.pdf", "other.pdf"}
+
+
+def test_file_lookups_page_through_collection(pool):
+    adaptor = qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+    add_points(adaptor, "a.pdf", count=1500)
+    add_points(adaptor, "b.pdf", count=3)
+
+    assert sorted(adaptor.list_file_path()) == ["a.pdf", "b.pdf"]
+    assert adaptor.has_file("b.pdf")
+    assert not adaptor.has_file("c.pdf")
+
+
+def test_rebuilds_keep_live_and_previous_versions(pool, tmp_path):
+    adaptor = qdrant_adaptors.QdrantAdaptor("kb", pool=pool)
+    add_points(adaptor, "a.pdf")
+    adaptor.export_collection(str(tmp_path))
+
+    builds = [
+        adaptor.rebuild_collection(export_dir=str(tmp_path), replace_collection=True)
+        for _ in range(4)
+    ]
+
+    assert adaptor.list_collection_versions() == builds[-2:]
+    assert adaptor.rollback_alias() == builds[-2]
+    assert adaptor.list_collection_versions() == builds[-2:]
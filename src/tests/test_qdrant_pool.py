@@ -0,0 +1,266 @@
+# Tests for the pooled Qdrant access layer.
+#
+# The pool only needs objects with the called methods, so most tests use in-process
+# fake clients. The last test runs real QdrantClients against local stand-in
+# servers that inject delays, and is skipped when qdrant-client is not installed.
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from adaptors.qdrant_pool import LatencyHistogram, QdrantPool, is_retryable
+
+
+class FakeClient:
+    """
+    A client whose `get` sleeps for `delay` seconds and fails for its first `failures` calls.
+    """
+
+    def __init__(self, name, delay=0.0, failures=0, error=ConnectionError):
+        self.name = name
+        self.delay = delay
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def get(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise self.error("injected failure")
+        return self.name
+
+
+class FakeAsyncClient(FakeClient):
+    async def get(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise self.error("injected failure")
+        return self.name
+
+
+def make_pool(clients, **kwargs):
+    kwargs.setdefault("timeouts", {"get": 1.0})
+    kwargs.setdefault("backoff", 0.01)
+    return QdrantPool(clients=clients, **kwargs)
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for _ in range(90):
+        histogram.observe(0.004)
+    for _ in range(10):
+        histogram.observe(0.4)
+
+    assert histogram.percentile(50) == 0.005
+    assert histogram.percentile(95) == 0.5
+    assert histogram.snapshot()["count"] == 100
+
+
+def test_histogram_empty():
+    assert LatencyHistogram().percentile(95) is None
+
+
+def test_read_hedges_slow_client():
+    slow, fast = FakeClient("slow", delay=0.5), FakeClient("fast")
+    pool = make_pool([slow, fast], hedge_min_delay=0.01)
+    pool._histogram("get").observe(0.01)  # p95 of 10 ms -> hedge after 10 ms
+
+    start = time.perf_counter()
+    assert pool.read("get", lambda c: c.get()) == "fast"
+    assert time.perf_counter() - start < 0.3
+    assert pool.counters["hedged"] == 1
+
+
+def test_read_does_not_hedge_fast_client():
+    pool = make_pool([FakeClient("a"), FakeClient("b")])
+    pool._histogram("get").observe(0.2)
+
+    pool.read("get", lambda c: c.get())
+    assert pool.counters["hedged"] == 0
+
+
+def test_read_retries_retryable_errors():
+    client = FakeClient("flaky", failures=2)
+    pool = make_pool([client], retries=2)
+
+    assert pool.read("get", lambda c: c.get()) == "flaky"
+    assert client.calls == 3
+    assert pool.counters["retries"] == 2
+
+
+def test_read_does_not_retry_other_errors():
+    client = FakeClient("broken", failures=5, error=ValueError)
+    pool = make_pool([client], retries=2)
+
+    with pytest.raises(ValueError):
+        pool.read("get", lambda c: c.get())
+    assert client.calls == 1
+    assert pool.counters["errors"] == 1
+
+
+def test_read_times_out():
+    pool = make_pool([FakeClient("stuck", delay=0.5)], timeouts={"get": 0.1}, retries=0)
+
+    with pytest.raises(TimeoutError):
+        pool.read("get", lambda c: c.get())
+    assert pool.counters["timeouts"] == 1
+
+
+def test_write_is_not_retried():
+    client = FakeClient("flaky", failures=1)
+    pool = make_pool([client], retries=2)
+
+    with pytest.raises(ConnectionError):
+        pool.write("get", lambda c: c.get())
+    assert client.calls == 1
+
+
+def test_write_uses_write_client():
+    readers = [FakeClient("a"), FakeClient("b")]
+    pool = make_pool(readers, write_client=FakeClient("writer"))
+
+    assert pool.write("get", lambda c: c.get()) == "writer"
+    assert pool.read("get", lambda c: c.get()) in ("a", "b")
+    assert sum(reader.calls for reader in readers) == 1
+
+
+def test_read_prefers_client_without_abandoned_calls():
+    slow, fast = FakeClient("slow", delay=0.5), FakeClient("fast")
+    pool = make_pool([slow, fast], hedge_min_delay=0.01)
+    pool._histogram("get").observe(0.01)
+
+    assert pool.read("get", lambda c: c.get()) == "fast"
+    assert pool.counters["hedged"] == 1
+
+    # The slow client still holds the abandoned call, so it is not picked as primary.
+    for _ in range(3):
+        assert pool.read("get", lambda c: c.get()) == "fast"
+    assert pool.counters["hedged"] == 1
+    assert slow.calls == 1
+
+
+def test_abandoned_reads_do_not_starve_executor():
+    stuck = [FakeClient("a", delay=1.0), FakeClient("b", delay=1.0)]
+    pool = make_pool(stuck, timeouts={"get": 0.1}, retries=0, hedge_min_delay=0.01)
+
+    for _ in range(4):
+        with pytest.raises(TimeoutError):
+            pool.read("get", lambda c: c.get())
+
+    start = time.perf_counter()
+    assert pool.read("healthy", lambda c: "ok") == "ok"
+    assert time.perf_counter() - start < 0.1
+
+
+def test_read_client_timeout_ignores_upload_timeout():
+    pool = make_pool([FakeClient("a")], timeouts={"query": 2.0, "upsert": 600.0})
+
+    assert pool.read_client_timeout == 30
+
+
+def test_is_retryable_status_codes():
+    class UnexpectedResponse(Exception):
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    assert is_retryable(UnexpectedResponse(503))
+    assert is_retryable(UnexpectedResponse(429))
+    assert not is_retryable(UnexpectedResponse(404))
+
+
+def test_async_read_hedges_slow_client():
+    slow, fast = FakeAsyncClient("slow", delay=0.5), FakeAsyncClient("fast")
+    pool = make_pool(
+        [FakeClient("a"), FakeClient("b")],
+        async_clients=[slow, fast],
+        hedge_min_delay=0.01,
+    )
+    pool._histogram("get").observe(0.01)
+
+    start = time.perf_counter()
+    assert asyncio.run(pool.aread("get", lambda c: c.get())) == "fast"
+    assert time.perf_counter() - start < 0.3
+
+
+def test_async_read_retries():
+    client = FakeAsyncClient("flaky", failures=1)
+    pool = make_pool([FakeClient("a")], async_clients=[client])
+
+    assert asyncio.run(pool.aread("get", lambda c: c.get())) == "flaky"
+    assert client.calls == 2
+
+
+def start_stand_in_server(delay: float):
+    """
+    Start a minimal Qdrant REST stand-in that answers point queries after `delay` seconds.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body):
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._send({"title": "qdrant stand-in", "version": "1.12.0"})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            self._send(
+                {
+                    "result": {
+                        "points": [
+                            {"id": 1, "version": 0, "score": 1.0, "payload": {"delay": delay}}
+                        ]
+                    },
+                    "status": "ok",
+                    "time": delay,
+                }
+            )
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_hedged_query_against_stand_in_servers():
+    qdrant_client = pytest.importorskip("qdrant_client")
+
+    slow_server = start_stand_in_server(delay=1.0)
+    fast_server = start_stand_in_server(delay=0.0)
+    try:
+        clients = [
+            qdrant_client.QdrantClient(
+                url=f"http://127.0.0.1:{server.server_port}", timeout=5
+            )
+            for server in (slow_server, fast_server)
+        ]
+        pool = QdrantPool(clients=clients, timeouts={"query": 3.0}, hedge_min_delay=0.05)
+        pool._histogram("query").observe(0.05)
+        observed = pool.metrics()["operations"]["query"]["count"]
+
+        start = time.perf_counter()
+        response = pool.read(
+            "query", lambda c: c.query_points(collection_name="stand-in", query=[0.1, 0.2])
+        )
+        elapsed = time.perf_counter() - start
+
+        assert response.points[0].payload == {"delay": 0.0}
+        assert elapsed < 0.8
+        assert pool.metrics()["operations"]["query"]["count"] == observed + 1
+        assert pool.counters["hedged"] == 1
+    finally:
+        slow_server.shutdown()
+        fast_server.shutdown()
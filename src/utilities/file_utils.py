@@ -0,0 +1,19 @@
+import hashlib
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Computes the SHA-256 digest of a file's content.
+
+    Args:
+        file_path (str): The path of the file to hash.
+        block_size (int, optional): Bytes read per iteration. Defaults to 1 MiB.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
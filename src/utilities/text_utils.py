@@ -1,6 +1,5 @@
 import re
 import unicodedata
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
 def text_splitter(docs: str):
@@ -13,6 +12,8 @@ def text_splitter(docs: str):
     Returns:
         None: This function prints the number of sub-documents created but does not return anything.
     """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+class Throttle:
+    """
+    A token bucket that caps the throughput of a background job.
+
+    Attributes:
+        rate (float): The number of units allowed per second.
+        burst (float): The maximum number of units that can be taken at once without waiting.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        """
+        Initialize the Throttle.
+
+        Args:
+            rate (float): The number of units allowed per second.
+            burst (float | None, optional): The bucket size. Defaults to one second of `rate`.
+        """
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units: float = 1):
+        """
+        Block until `units` may be processed.
+
+        Requests larger than the bucket are allowed but wait for a proportionally longer time.
+
+        Args:
+            units (float, optional): The number of units about to be processed. Defaults to 1.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= units
+            wait_seconds = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait_seconds:
+            time.sleep(wait_seconds)